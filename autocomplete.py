@@ -1,3 +1,21 @@
+import codecs
+import copy
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from functools import wraps
+from itertools import chain, groupby, islice, repeat
+
+
 class Node:
     """This class represents one node of a trie tree
     
@@ -9,17 +27,34 @@ class Node:
         True if the character is the end of a valid word
     self.parent --> Node
         the parent node, i.e. each node only has one parent, None if root node
-    self.children --> list of Node
-        a list of children nodes, i.e. each node can have multiple children, empty if leaf node
+    self.children --> dict of str: Node
+        the children nodes keyed by their character, i.e. each node can have multiple 
+        children, empty if leaf node
+    self.occurrence --> int
+        the number of times the word ending at this node was inserted
+    self.top_k --> list of tuples / None
+        the ranked (word, occurrence) completions of this node's subtree, only kept
+        up to date when the trie is built with cache_k, None otherwise
+    self.word_id --> int / None
+        the id of the word ending at this node, given when the word is first inserted
+        and kept until it is removed, None if the node is not valid
+    self.best --> int
+        the highest occurrence of a word in the node's subtree, itself included, 
+        0 if there is none
         
     Methods
     -------
     get_child(self, char)
         returns the child corresponding to the input char if present, otherwise return False.
+    add_child(self, char)
+        creates a child node for the input char and returns it.
     sorted_children(self)
         Returns the children of a node but sorted by in alphabetical order
     """
 
+    # no per-instance __dict__, which is most of the memory of a small node
+    __slots__ = ("char", "valid", "parent", "children", "occurrence", "top_k", "word_id", "best", "_sorted_children")
+
     def __init__(self, char):
         """Creates the Node instance.
         
@@ -31,8 +66,12 @@ class Node:
         self.char = char 
         self.valid = False
         self.parent = None
-        self.children = []
+        self.children = {}
         self.occurrence = 0 # new attribute to store occurrence when building the trie
+        self.top_k = None # new attribute to store the precomputed top-k completions
+        self.word_id = None # new attribute to store the stable id of the word
+        self.best = 0 # new attribute to store the bound of the subtree's occurrences
+        self._sorted_children = None # cached by sorted_children(), reset by add_child()
         
     def __repr__(self):
         """Overrides the defauly print implementation."""
@@ -48,22 +87,42 @@ class Node:
     
     def get_child(self, char):
         """Returns the child corresponding to the input char if present in 
-        the node's list of children. Otherwise returns False.
+        the node's children. Otherwise returns False.
         
         Parameters
         ----------
         char : str
             The character to be checked in the node's children
         """        
-        for child in self.children:
-            if child == char: # this is made possible by __eq__()
-                return child
-        return False
+        return self.children.get(char, False)
+    
+    # new method
+    def add_child(self, char):
+        """Creates a child node for the input char and links it to this node.
+        
+        Parameters
+        ----------
+        char : str
+            The character the new child represents
+            
+        Returns
+        ----------
+        Node
+            the new child node
+        """
+        child = Node(char)
+        child.parent = self
+        self.children[char] = child
+        self._sorted_children = None # the cached order no longer includes the new child
+        return child
     
     # new method
     def sorted_children(self):
         """Returns the children of a node but sorted by in alphabetical order.
         
+        The sorted list is cached until the next add_child(), so repeated traversals
+        don't sort the same children again. It must not be modified by the caller.
+        
         Returns
         ----------
         sorted_children : list of Nodes
@@ -74,10 +133,684 @@ class Node:
             return []
         
         # else sort the children with key as node.char
-        sorted_children = sorted(self.children, key=lambda x: x.char)
+        if self._sorted_children is None:
+            self._sorted_children = sorted(self.children.values(), key=lambda x: x.char)
+        
+        return self._sorted_children
+
+
+def _rank_key(item):
+    """Sort key for (word, occurrence) tuples: most common first, ties alphabetically."""
+    return (-item[1], item[0])
+
+
+def _update_top_k(top_k, word, occurrence, k):
+    """Updates a ranked top-k list in place after the occurrence of word increased.
+    
+    Since only one word changes at a time and its count only grows, the word either
+    moves up inside the list or pushes out the current last entry, so the list stays
+    exactly the top k of the subtree.
+    
+    Parameters
+    ----------
+    top_k : list of tuples
+        ranked (word, occurrence) tuples, at most k of them
+    word : str
+        the word whose occurrence has just increased
+    occurrence : int
+        the new occurrence of the word
+    k : int
+        the maximum number of entries to keep
+    """
+    for i, (cached_word, _) in enumerate(top_k):
+        if cached_word == word:
+            del top_k[i]
+            break
+    
+    entry = (word, occurrence)
+    if len(top_k) >= k and _rank_key(entry) > _rank_key(top_k[-1]):
+        return
+    
+    top_k.append(entry)
+    top_k.sort(key=_rank_key)
+    del top_k[k:]
+
+
+def _best_completion(ranked, prefix):
+    """Picks the autocompletion out of a ranked list of (word, occurrence) tuples.
+    
+    When the prefix itself ties with a longer word for the highest occurrence, the
+    longer word wins, which is what most_common() has always returned. Falls back
+    to the prefix itself if there are no completions at all.
+    """
+    if not ranked:
+        return prefix
+    
+    if ranked[0][0] == prefix and len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+        return ranked[1][0]
+    
+    return ranked[0][0]
+
+
+# header of the files written by Trie.save(): magic, format version, number of nodes, edges,
+# characters in the alphabet and words, and the id the next new word would get
+MAGIC = b"TRIE"
+FORMAT_VERSION = 3
+_HEADER = struct.Struct("<4sIIIIII")
+_NO_ID = 0xFFFFFFFF # stands for a missing node or word id in the tables of the file
+_READ_ONLY = "a MappedTrie is read-only, load it with mmap=False to modify it"
+
+# where prebuilt() finds the trie files written by the command line, see the end of this file
+PREBUILT_DIR = os.environ.get("AUTOCOMPLETE_TRIES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tries"))
+
+# punctuation dropped by the default tokenizer, hyphens are kept since they join words
+BAD_CHARS = ';,.?!_[]:“”"–'
+_BAD_CHARS_TABLE = str.maketrans("", "", BAD_CHARS)
+
+
+def tokenize(text):
+    """Default tokenizer: drops punctuation and splits the text on white space.
+    
+    Parameters
+    ----------
+    text : str
+        A piece of raw text, e.g. a chunk of a corpus file.
+        
+    Returns
+    ----------
+    list
+        List of strings, the words in the text.
+    """
+    return text.translate(_BAD_CHARS_TABLE).split()
+
+
+def _count_words(text, tokenizer):
+    """Counts the lower-case words of a piece of text, run by the workers of Trie.build_parallel()."""
+    return Counter(word.lower() for word in tokenizer(text))
+
+
+def _code_typecode(alphabet_size):
+    """Returns the array typecode of the smallest unsigned integer holding the codes of an alphabet."""
+    if alphabet_size <= 1 << 8:
+        return "B"
+    if alphabet_size <= 1 << 16:
+        return "H"
+    return "I"
+
+
+def _write_tables(path, parent, chars, occurrence, valid, node_word, next_id):
+    """Writes the file of Trie.save() from one entry per node, in alphabetical depth-first order.
+    
+    Parameters
+    ----------
+    path : str / path
+        The file to be written, replaced if it exists.
+    parent, chars, occurrence, valid, node_word : arrays
+        The parent of each node, _NO_ID for the root, the code point of the 
+        character leading to it, 0 for the root, its occurrence, whether it ends 
+        a word and the id of that word, else _NO_ID.
+    next_id : int
+        The id the next new word would get.
+        
+    Note: in depth-first order the children of a node come in alphabetical order, 
+    so the edges are their ids grouped by parent, one counting pass apart.
+    """
+    n_nodes = len(parent)
+    
+    # code order is character order, so the codes of a node's edges stay sorted
+    alphabet = array("I", sorted(set(chars[1:])))
+    codes = {code_point: code for code, code_point in enumerate(alphabet)}
+    
+    first_edge = array("I", repeat(0, n_nodes + 1))
+    for node in range(1, n_nodes):
+        first_edge[parent[node] + 1] += 1
+    for node in range(n_nodes):
+        first_edge[node + 1] += first_edge[node]
+    
+    edge_child = array("I", repeat(0, n_nodes - 1))
+    edge_code = array(_code_typecode(len(alphabet)), repeat(0, n_nodes - 1))
+    filled = first_edge[:-1] # the next free edge of each node
+    for node in range(1, n_nodes):
+        edge = filled[parent[node]]
+        edge_child[edge] = node
+        edge_code[edge] = codes[chars[node]]
+        filled[parent[node]] += 1
+    
+    # the nodes of the words sorted by id, MappedTrie.word_of() searches the ids in them
+    word_node = array("I", sorted((node for node, word_id in enumerate(node_word) if word_id != _NO_ID), 
+                                  key=node_word.__getitem__))
+    
+    tables = (first_edge, occurrence, parent, node_word, word_node, edge_child, alphabet, edge_code, valid)
+    
+    with open(path, "wb") as fileobj:
+        fileobj.write(_HEADER.pack(MAGIC, FORMAT_VERSION, n_nodes, len(edge_child), len(alphabet), len(word_node), next_id))
+        for table in tables:
+            if sys.byteorder == "big":
+                table = array(table.typecode, table)
+                table.byteswap()
+            table.tofile(fileobj)
+
+
+class ResultCache:
+    """This class caches query results of a trie, see Trie.enable_result_cache().
+    
+    Entries are keyed by the query, whose lower-case prefix is indexed, so an
+    insertion only drops the entries of the prefixes of the inserted word.
+    
+    Parameters
+    ----------
+    self.max_size --> int
+        the maximum number of entries, the least recently used one is evicted
+    self.ttl --> float / None
+        the number of seconds an entry stays valid, None to keep it until evicted
+    self.hits, self.misses, self.evictions, self.expirations, self.invalidations --> int
+        counters since the cache was created
+    """
+    
+    def __init__(self, max_size = 1024, ttl = None):
+        """Creates an empty ResultCache instance."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict() # key: (result, prefix, expiry time), least recently used first
+        self._keys_by_prefix = {}
+    
+    def __len__(self):
+        """Returns the number of entries."""
+        return len(self._entries)
+    
+    def get(self, key, prefix, compute):
+        """Returns the cached result of a query, computing and caching it on a miss.
+        
+        Parameters
+        ----------
+        key : tuple
+            Identifies the query, e.g. ("top_k_completions", "th", 5).
+        prefix : str
+            The lower-case prefix the result depends on, "" for the whole trie.
+        compute : function
+            Called without arguments on a miss, returns the result.
+        """
+        entry = self._entries.get(key)
+        
+        if entry is not None:
+            if self.ttl is None or entry[2] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            
+            self.expirations += 1
+            self._discard(key)
+        
+        self.misses += 1
+        result = compute()
+        
+        expiry = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (result, prefix, expiry)
+        self._keys_by_prefix.setdefault(prefix, set()).add(key)
+        
+        if len(self._entries) > self.max_size:
+            self.evictions += 1
+            self._discard(next(iter(self._entries)))
+        
+        return result
+    
+    def invalidate(self, word):
+        """Drops the entries of every prefix of a word whose subtree has changed."""
+        for i in range(len(word) + 1):
+            keys = self._keys_by_prefix.pop(word[:i], ())
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+    
+    def clear(self):
+        """Drops every entry, e.g. after all occurrences have changed."""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._keys_by_prefix.clear()
+    
+    def stats(self):
+        """Returns the counters and the number of entries as a dict."""
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries)}
+    
+    # inner method
+    def _discard(self, key):
+        """Removes an entry along with its key in the prefix index."""
+        prefix = self._entries.pop(key)[1]
+        keys = self._keys_by_prefix[prefix]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_prefix[prefix]
+
+
+def _cached_result(method):
+    """Decorator serving a query method of Trie from the result cache once it is enabled.
+    
+    The arguments are matched with the parameters of the method by name, so keywords
+    work as well. The key is made of the lower-case prefix and k, a method without
+    a prefix depends on the whole trie, e.g. k_most_common(k).
+    
+    Note: the names are read off the code object rather than with inspect, which 
+    would add to the import time.
+    """
+    parameters = method.__code__.co_varnames[1:method.__code__.co_argcount] # without self
+    
+    @wraps(method)
+    def cached(self, *args, **kwargs):
+        if self.result_cache is None:
+            return method(self, *args, **kwargs)
+        
+        # a wrong call goes through, so it raises the TypeError of the method
+        if len(args) > len(parameters) or not kwargs.keys() <= set(parameters[len(args):]):
+            return method(self, *args, **kwargs)
+        
+        arguments = dict(zip(parameters, args), **kwargs)
+        prefix = arguments.get("prefix", "")
+        if isinstance(prefix, str):
+            prefix = prefix.lower()
+        key = (method.__name__, prefix, arguments.get("k"))
+        
+        result = self.result_cache.get(key, prefix, lambda: method(self, *args, **kwargs))
+        
+        # a list would be shared with the next hit, so the caller gets a copy
+        return result[:] if isinstance(result, list) else result
+    
+    return cached
+
+
+class Scorer:
+    """This class ranks words by their occurrence, and is the interface of the scorers
+    of Trie.top_k_scored().
+    
+    A scorer has two methods, which subclasses override together:
+    
+        score(word, occurrence)  the score of a word, higher ranks first
+        bound(prefix, best)      an upper bound of the score of every word starting
+                                 with prefix whose occurrence is at most best
+    
+    The search skips every subtree whose bound is below the k-th best score found
+    so far, so the tighter the bound, the fewer nodes are visited. A scorer must 
+    not change while a trie uses it.
+    """
+    
+    def score(self, word, occurrence):
+        """Returns the score of a word, its occurrence."""
+        return occurrence
+    
+    def bound(self, prefix, best):
+        """Returns the highest score of a word below prefix, the highest occurrence below it."""
+        return best
+
+
+class WeightedScorer(Scorer):
+    """This class blends the frequency of a word with its length, a per-user boost and 
+    how recently it was used, each with its weight:
+    
+        frequency * log(1 + occurrence) - length * len(word) + boosts[word] 
+            + recency * 0.5 ** (age / half_life)
+    
+    age being the seconds since last_used[word]. A word without a boost or a use
+    gets 0 for that signal.
+    
+    Parameters
+    ----------
+    self.frequency, self.length, self.recency --> float
+        the weights, none of them negative: longer words only ever lose score
+    self.boosts --> dict of str: float
+        the boost of each word
+    self.last_used --> dict of str: float
+        when each word was last used, as a time.time() timestamp
+    self.half_life --> float
+        the number of seconds after which the recency of a word is halved
+    self.now --> float
+        the time the ages are measured from
+    """
+    
+    def __init__(self, frequency = 1.0, length = 0.0, boosts = None, recency = 0.0, last_used = None, 
+                 half_life = 86400.0, now = None):
+        """Creates the WeightedScorer instance and indexes the boosts and uses by prefix."""
+        if frequency < 0 or length < 0 or recency < 0:
+            raise ValueError("the weights of a WeightedScorer must not be negative")
+        
+        self.frequency = frequency
+        self.length = length
+        self.recency = recency
+        self.boosts = dict(boosts or {})
+        self.last_used = dict(last_used or {})
+        self.half_life = half_life
+        self.now = time.time() if now is None else now
+        
+        # the highest boost and recency of the words below each prefix, i.e. their bounds
+        self._best_boost = self._best_by_prefix(self.boosts)
+        self._best_recency = self._best_by_prefix({word: self._recency(word) for word in self.last_used})
+    
+    def score(self, word, occurrence):
+        """Returns the blended score of a word."""
+        return (self.frequency * math.log1p(occurrence) - self.length * len(word) 
+                + self.boosts.get(word, 0.0) + self._recency(word))
+    
+    def bound(self, prefix, best):
+        """Returns the highest score of a word below prefix: it is at least as long as the 
+        prefix, and a word without a boost scores 0 for it, which may beat a negative one."""
+        return (self.frequency * math.log1p(best) - self.length * len(prefix) 
+                + max(self._best_boost.get(prefix, 0.0), 0.0) + self._best_recency.get(prefix, 0.0))
+    
+    # inner method
+    def _recency(self, word):
+        """Returns the weighted recency of a word, 0 if it was never used."""
+        if word not in self.last_used:
+            return 0.0
+        return self.recency * 0.5 ** (max(self.now - self.last_used[word], 0.0) / self.half_life)
+    
+    # inner method
+    def _best_by_prefix(self, values):
+        """Returns the highest of the values of the words starting with each of their prefixes."""
+        best = {}
+        for word, value in values.items():
+            for i in range(len(word) + 1):
+                if best.get(word[:i], value) <= value:
+                    best[word[:i]] = value
+        return best
+
+
+class InfixIndex:
+    """This class finds the words containing a fragment anywhere, see Trie.enable_infix_index().
+    
+    It is an inverted index of the n-grams of the distinct words, up to 3 characters 
+    long. Words are numbered by rank, i.e. by occurrence with ties broken 
+    alphabetically, so every posting list is sorted by rank: a query scans the 
+    shortest posting list among the n-grams of the fragment, keeps the words that 
+    contain the whole fragment and stops after k of them.
+    
+    A write to the trie only records the word in self.changed. Searches skip those
+    words, whose ranks are out of date, and the trie checks them one by one, until
+    there are so many that it rebuilds the index, see needs_rebuild().
+    
+    Parameters
+    ----------
+    self.words --> list of str
+        the words, most common first
+    self.occurrences --> list of int
+        the occurrence of each word
+    self.stale --> bool
+        True once every occurrence has changed, e.g. after decay(), the trie then rebuilds
+        the index before its next query
+    self.changed --> set of str
+        the words inserted, changed or removed since the index was built
+    """
+    
+    GRAM = 3
+    
+    # the trie rebuilds the index once more than this share of the words has changed
+    REBUILD_FRACTION = 1 / 16
+    MIN_REBUILD = 1024
+    
+    def __init__(self, words):
+        """Builds the InfixIndex instance.
+        
+        Parameters
+        ----------
+        words : iterable
+            (word, occurrence) tuples, each word once, e.g. from Trie._iter_words().
+        """
+        ranked = sorted(words, key=_rank_key)
+        self.words = [word for word, _ in ranked]
+        self.occurrences = [occurrence for _, occurrence in ranked]
+        self.stale = False
+        self.changed = set()
+        
+        # ranks are appended in increasing order, so the posting lists come out sorted
+        self._postings = {}
+        for rank, word in enumerate(self.words):
+            grams = {word[i:i + n] for n in range(1, self.GRAM + 1) for i in range(len(word) - n + 1)}
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array("I")
+                postings.append(rank)
+    
+    def __len__(self):
+        """Returns the number of distinct n-grams."""
+        return len(self._postings)
+    
+    def needs_rebuild(self):
+        """Returns True if rebuilding the index is cheaper than checking the changed words,
+        or if it is stale.
+        
+        Note: the threshold grows with the number of words, so the rebuilds add O(1) 
+        per write, like the resizing of a list.
+        """
+        return self.stale or len(self.changed) > max(self.MIN_REBUILD, self.REBUILD_FRACTION * len(self.words))
+    
+    def search(self, fragment, k):
+        """Finds the k most common words containing a fragment, except the changed ones.
+        
+        Parameters
+        ----------
+        fragment : str
+            The characters to be found, already normalized.
+        k : int
+            Number of words to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (word, occurrence) tuples sorted by occurrence, ties broken alphabetically.
+        """
+        if len(fragment) <= self.GRAM:
+            # the fragment is an n-gram itself, every word of its list contains it
+            candidates = self._postings.get(fragment, ()) if fragment else range(len(self.words))
+            if not self.changed:
+                return [(self.words[rank], self.occurrences[rank]) for rank in candidates[:k]]
+        else:
+            # every n-gram of the fragment has to be in the word, the rarest one rules out the most
+            grams = [fragment[i:i + self.GRAM] for i in range(len(fragment) - self.GRAM + 1)]
+            candidates = min((self._postings.get(gram, ()) for gram in grams), key=len)
+        
+        matches = []
+        for rank in candidates:
+            word = self.words[rank]
+            if fragment in word and word not in self.changed:
+                matches.append((word, self.occurrences[rank]))
+                if len(matches) == k:
+                    break
+        
+        return matches
+
+
+class Instrumentation:
+    """This class measures the cost of the public method calls of one trie.
+    
+    Enabling it shadows the methods of the trie with timed wrappers on the instance 
+    itself, and the traversal primitives with counting ones, so a trie without 
+    instrumentation runs the plain methods and pays nothing. Each public call is 
+    timed and counts:
+    
+        nodes_visited       nodes reached by walks and subtree traversals
+        child_lookups       characters looked-up in the children of a node
+        words_materialized  (word, occurrence) tuples built from a subtree
+    
+    Calls made by another public method, e.g. insert() by add(), count towards
+    the outer one. It is not thread-safe.
+    
+    Parameters
+    ----------
+    self.trie --> Trie
+        the instrumented trie
+    """
+    
+    METHODS = ("insert", "bulk_load", "merge", "add", "remove", "decay", "lookup", "peek_occurrence", 
+               "alphabetical_list", "k_most_common", "autocomplete", "top_k_completions", 
+               "lookup_many", "autocomplete_many", "fuzzy_autocomplete", "infix_search", "completions", "top_k_scored")
+    COUNTERS = ("nodes_visited", "child_lookups", "words_materialized")
+    
+    def __init__(self, trie):
+        """Creates the Instrumentation instance and wraps the methods of the trie."""
+        self.trie = trie
+        self._stats = {}
+        self._current = None # counters of the public call in progress, in the order of COUNTERS
+        self._wrapped = []
+        
+        for name in self.METHODS:
+            self._wrap(name, self._timed(name, getattr(trie, name)))
+        
+        self._wrap("_walk", self._counted_walk(trie._walk))
+        self._wrap("_child", self._counted_child(trie._child))
+        self._wrap("_insert_from", self._counted_insert(trie._insert_from))
+        self._wrap("_iter_nodes", self._counted_iter(trie._iter_nodes, 0))
+        self._wrap("_iter_words", self._counted_iter(trie._iter_words, 2))
+        self._wrap("_children", self._counted_iter(trie._children, 0))
+    
+    def snapshot(self):
+        """Returns the statistics of each method called so far.
+        
+        Returns
+        ----------
+        dict
+            For each method name: the number of calls, their total seconds, the
+            totals of the counters and their histograms, including one of the 
+            microseconds per call. A histogram maps a power of two to the number 
+            of calls whose value was below it and at least its half (0 for 1).
+        """
+        return {name: {"calls": stats["calls"],
+                       "seconds": stats["seconds"],
+                       "totals": dict(stats["totals"]),
+                       "histograms": {metric: dict(sorted(histogram.items())) 
+                                      for metric, histogram in stats["histograms"].items()}}
+                for name, stats in self._stats.items()}
+    
+    def reset(self):
+        """Drops the statistics collected so far."""
+        self._stats = {}
+    
+    def detach(self):
+        """Removes the wrappers from the trie, see Trie.disable_instrumentation()."""
+        for name in self._wrapped:
+            delattr(self.trie, name)
+        self._wrapped = []
+    
+    # inner method
+    def _wrap(self, name, wrapper):
+        """Shadows a method of the trie with a wrapper."""
+        setattr(self.trie, name, wrapper)
+        self._wrapped.append(name)
+    
+    # inner method
+    def _timed(self, name, method):
+        """Returns a wrapper timing a public method and collecting its counters."""
+        @wraps(method)
+        def timed(*args, **kwargs):
+            # a call made by another public method counts towards that one
+            if self._current is not None:
+                return method(*args, **kwargs)
+            
+            counters = self._current = [0, 0, 0]
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                self._current = None
+                self._record(name, seconds, counters)
+        
+        return timed
+    
+    # inner method
+    def _record(self, name, seconds, counters):
+        """Adds a finished call to the statistics of its method."""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {"calls": 0, "seconds": 0.0,
+                                         "totals": dict.fromkeys(self.COUNTERS, 0),
+                                         "histograms": {metric: {} for metric in ("microseconds",) + self.COUNTERS}}
+        
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        
+        for metric, value in zip(("microseconds",) + self.COUNTERS, [int(seconds * 1e6)] + counters):
+            if metric != "microseconds":
+                stats["totals"][metric] += value
+            bucket = 1 << value.bit_length()
+            histogram = stats["histograms"][metric]
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+    
+    # inner method
+    def _counted_walk(self, walk):
+        """Returns a wrapper counting the nodes of a walk down from the root.
+        
+        Note: the counted walk is the trie's _walk_steps(), so a failed walk counts
+        the nodes it reached and the look-up it failed at, and a RadixTrie its edges.
+        """
+        walk_steps = self.trie._walk_steps
+        
+        def counted_walk(prefix):
+            if self._current is None:
+                return walk(prefix)
+            
+            node, steps = walk_steps(prefix)
+            self._current[0] += steps if node is not False else steps - 1
+            self._current[1] += steps
+            return node
+        
+        return counted_walk
+    
+    # inner method
+    def _counted_child(self, child):
+        """Returns a wrapper counting the single steps of the batched walks."""
+        def counted_child(node, char):
+            if self._current is None:
+                return child(node, char)
+            
+            node = child(node, char)
+            self._current[0] += node is not False
+            self._current[1] += 1
+            return node
+        
+        return counted_child
+    
+    # inner method
+    def _counted_insert(self, insert_from):
+        """Returns a wrapper counting the nodes an insertion walks down.
+        
+        Note: the nodes are counted by walking to the inserted word, less the ones
+        already on the path, so that the edges of a RadixTrie count as one each.
+        """
+        walk_steps = self.trie._walk_steps
+        
+        def counted_insert(path, word, count):
+            if self._current is None:
+                return insert_from(path, word, count)
+            
+            shared = len(path) - 1
+            result = insert_from(path, word, count)
+            steps = walk_steps(word)[1] - shared
+            self._current[0] += steps
+            self._current[1] += steps
+            return result
         
-        return sorted_children
+        return counted_insert
+    
+    # inner method
+    def _counted_iter(self, iterate, counter):
+        """Returns a wrapper counting the items a traversal yields, in the given counter."""
+        def counted_iter(*args):
+            for item in iterate(*args):
+                if self._current is not None:
+                    self._current[counter] += 1
+                yield item
         
+        return counted_iter
+
+
 class Trie:
     """This class represents the entirety of a trie tree.
     
@@ -85,325 +818,2815 @@ class Trie:
     ----------
     self.root --> Node
         the root node with an empty string
-    self.word_list --> list
-        the input list of words converted into lower-case
     self.tree --> None
         calls the create_trie() method so the trie is intialized upon instantiation
+    self.cache_k --> int / None
+        if set, every node keeps its cache_k most common completions up to date
+        during insert(), so autocomplete() no longer has to scan the subtree
+    self.result_cache --> ResultCache / None
+        the cached results of the queries, None (default) until enable_result_cache()
+    self.instrumentation --> Instrumentation / None
+        the statistics of the method calls, None (default) until enable_instrumentation()
+    self.infix_index --> InfixIndex / None
+        the index of the fragments of the words, None (default) until enable_infix_index()
     
     Methods
     -------
+    from_stream(cls, source, tokenizer, chunk_size, progress, cache_k)
+        Builds a trie from a text file without loading the whole file into memory.
+    build_parallel(cls, chunks, workers, tokenizer, cache_k)
+        Builds a trie from pieces of text, counted by a pool of worker processes.
     create_trie(self, word_list)
-        Calls the insert() method for each word in word_list
-    insert(self, word)
+        Inserts each distinct word in word_list once with its occurrence
+    bulk_load(self, words)
+        Inserts many words at once, reusing the path shared with the previous word.
+    merge(self, other)
+        Adds the words of another trie or Counter, summing shared occurrences.
+    insert(self, word, count)
         Inserts a word into the trie, creating nodes as required.
+    add(self, word, count)
+        Adds a possibly negative count to the occurrence of a word.
+    remove(self, word)
+        Removes a word and prunes the nodes only it needed.
+    decay(self, factor)
+        Multiplies every occurrence by factor, removing the words that drop to zero.
     lookup(self, word)
         Determines whether a given word is present in the trie.
     peek_occurrence(self, word)
         Determines the occurrence of given word.
+    word_id(self, word), word_of(self, word_id):
+        Converts between a word and its stable integer id.
     k_most_common(self, k):
         Finds k words inserted into the trie most often.
-    
+    top_k_completions(self, prefix, k):
+        Finds the k most common words with the given prefix.
+    top_k_scored(self, prefix, k, scorer):
+        Finds the k words with the given prefix which score highest, e.g. blending signals.
+    completions(self, prefix, order, page_size, token):
+        Returns the words with the given prefix one page at a time.
+    save(self, path):
+        Writes the trie to a flat binary file which load() can memory-map.
+    load(cls, path, mmap, cache_k):
+        Loads a trie written by save().
+    memory_report(self):
+        Estimates the memory held by the nodes of the trie.
+    lookup_many(self, words):
+        Determines for each of the given words whether it is present in the trie.
+    autocomplete_many(self, prefixes, k):
+        Autocompletes many prefixes at once.
+    fuzzy_autocomplete(self, prefix, max_edits, k):
+        Finds the most common words whose beginning is within a few typos of the prefix.
+    enable_result_cache(self, max_size, ttl):
+        Caches the results of autocomplete(), top_k_completions() and k_most_common().
+    enable_instrumentation(self), disable_instrumentation(self):
+        Starts and stops measuring the cost of every public method call.
+    infix_search(self, fragment, k):
+        Finds the most common words containing the fragment anywhere.
+    enable_infix_index(self):
+        Indexes the fragments of the words, so infix_search() no longer scans every word.
+
     """
     
-    def __init__(self, word_list = None):
+    # opt-in, see enable_result_cache(), enable_instrumentation() and enable_infix_index()
+    result_cache = None
+    instrumentation = None
+    infix_index = None
+    
+    # counts the writes, so completions() knows whether a cursor's traversal still holds
+    _version = 0
+    _cursors = None
+    max_cursors = 128
+    
+    def __init__(self, word_list = None, cache_k = None):
         """Creates the Trie instance, inserts initial words if provided.
         
         Parameters
         ----------
-        word_list : list
-            List of strings to be inserted into the trie upon creation.
+        word_list : list / Mapping
+            List of strings to be inserted into the trie upon creation, or a 
+            Mapping such as a Counter from strings to their occurrences.
+        cache_k : int
+            Number of ranked completions to precompute on every node, 
+            None (default) to disable the cache.
         """
+        self.cache_k = cache_k
         self.root = Node("")
-        self.word_list = [word.lower() for word in word_list]
-        self.tree = self.create_trie()
+        if cache_k:
+            self.root.top_k = []
+        self._words = {} # the word of each id, see word_id()
+        self._next_id = 0
+        self.tree = self.create_trie(word_list)
     
     def __repr__(self):
         """Overrides the defauly print implementation."""
         return f"This trie has root: \n{self.root}"
     
-    def create_trie(self):
-        """Inserts all words from the input wordbank into the trie by calling self.insert()"""
-        for word in self.word_list:
-            self.insert(word)
-    
-    def insert(self, word):
-        """Inserts a word into the trie, creating missing nodes on the go.
+    # new method
+    @classmethod
+    def from_stream(cls, source, tokenizer = tokenize, chunk_size = 1 << 20, progress = False, cache_k = None):
+        """Builds a trie from a text file without loading the whole file into memory.
         
         Parameters
         ----------
-        word : str
-            The word to be inserted into the trie.
-        """
-
-        # iterate through each character of the word
-        current_node = self.root
-        
-        for i in range(len(word)): 
-            
-            # check if a child with the new character already exists
-            new_char = word[i]
-            child = current_node.get_child(new_char) 
+        source : str / path / file object
+            Path of a UTF-8 text file, or a file object opened in text or binary mode.
+        tokenizer : function
+            Turns a piece of text into a list of words, tokenize() by default.
+        chunk_size : int
+            Number of characters (bytes in binary mode) read at once.
+        progress : bool / function
+            If True, prints the number of tokens ingested and the tokens/sec rate 
+            after each chunk. A function is called with (tokens, seconds) instead.
+        cache_k : int
+            Passed on to the Trie constructor.
             
-            # if child doesn't exist, create new node instance
-            if child == False:
-                new_node = Node(new_char) 
-                new_node.parent = current_node # update parent attribute
-                current_node.children.append(new_node) # update children attribute
-                current_node = new_node
+        Returns
+        ----------
+        Trie
+            The trie holding every word of the text.
             
-            # if child exists, continue
-            else:
-                current_node = child
+        Note: a chunk is only tokenized up to its last white space, the trailing
+        partial word is carried over to the next chunk. Words are converted into
+        lower-case and inserted once per chunk with their count.
+        """
+        trie = cls(cache_k = cache_k)
         
-        # the last char of the word means it is a valid word
-        current_node.valid = True
-        # new line: records the occurrences of the word
-        current_node.occurrence += 1
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, encoding = "utf-8") as fileobj:
+                trie._ingest(fileobj, tokenizer, chunk_size, progress)
+        else:
+            trie._ingest(source, tokenizer, chunk_size, progress)
+        
+        return trie
     
-    def lookup(self, word):
-        """Determines whether a given word is present in the trie.
+    # new method
+    @classmethod
+    def build_parallel(cls, chunks, workers = None, tokenizer = tokenize, cache_k = None):
+        """Builds a trie from pieces of text, tokenizing and counting them in parallel.
         
         Parameters
         ----------
-        word : str
-            The word to be looked-up in the trie.
+        chunks : iterable of str
+            Pieces of raw text, e.g. the files of a corpus or parts of a large one.
+        workers : int
+            Number of worker processes, os.cpu_count() by default. With 1 worker the 
+            chunks are counted in this process.
+        tokenizer : function
+            Turns a piece of text into a list of words, tokenize() by default. It
+            is sent to the workers, so it must be a module-level function.
+        cache_k : int
+            Passed on to the Trie constructor.
             
         Returns
-        -------
-        bool
-            True if the word is present in trie; False otherwise.
+        ----------
+        Trie
+            The trie holding every word of the chunks, converted into lower-case.
             
-        Notes
-        -----
-        Your trie should ignore whether a word is capitalized.
-        E.g. trie.insert('Prague') should lead to trie.lookup('prague') = True
+        Note: each worker returns a Counter of its chunk, which is much cheaper to 
+        send back than a trie. The counters are merged into the trie as they arrive.
         """
-        # convert to lower-case, remove white spaces, replace in-word white spaces with hyphens
-        word = word.lower().strip().replace(" ", "-")
+        trie = cls(cache_k = cache_k)
         
-        current_node = self.root
+        if workers == 1:
+            for chunk in chunks:
+                trie.merge(_count_words(chunk, tokenizer))
+            return trie
         
-        for i in range(len(word)):    
-            
-            # goes down the trie by iteratively checking if a child exist
-            child = current_node.get_child(word[i])
-            if child != False:
-                current_node = child
-                
-            # if a child doesn't exist, immediately return False
-            if child == False:
-                return False
+        # imported here, since it takes most of the time of importing this module
+        from concurrent.futures import ProcessPoolExecutor
         
-        # return if the last character of the word is a valid word
-        return current_node.valid
+        with ProcessPoolExecutor(workers) as executor:
+            for counts in executor.map(_count_words, chunks, repeat(tokenizer)):
+                trie.merge(counts)
+        
+        return trie
     
-    # new method
-    def alphabetical_list(self):
-        """Delivers the content of the trie in alphabetical order.
+    # new inner method
+    def _ingest(self, fileobj, tokenizer, chunk_size, progress):
+        """Inner function to above. Reads, tokenizes and inserts chunk by chunk."""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        start = time.perf_counter()
+        tokens = 0
+        carry = ""
         
-        Returns
+        while True:
+            chunk = fileobj.read(chunk_size)
+            end_of_file = not chunk
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk, final = end_of_file)
+            
+            # at the end of the file the carried-over word is complete
+            if end_of_file:
+                text, carry = carry, ""
+            else:
+                text = carry + chunk
+                cut = len(text)
+                while cut and not text[cut - 1].isspace():
+                    cut -= 1
+                text, carry = text[:cut], text[cut:]
+            
+            words = tokenizer(text)
+            self.bulk_load(Counter(words))
+            tokens += len(words)
+            
+            if progress:
+                seconds = time.perf_counter() - start
+                if callable(progress):
+                    progress(tokens, seconds)
+                else:
+                    print(f"NOTE: {tokens:,} tokens ingested ({tokens / max(seconds, 1e-9):,.0f} tokens/sec)")
+            
+            if end_of_file:
+                return
+    
+    def create_trie(self, word_list):
+        """Inserts all words from the input wordbank into the trie.
+        
+        Parameters
         ----------
-        list
-            List of strings, all words from the trie in alphabetical order.
+        word_list : list / Mapping
+            List of strings, or a Mapping such as a Counter from strings to 
+            their occurrences. Nothing is inserted if None.
+            
+        Note: a list is counted first, so each distinct word is inserted once with 
+        its occurrence instead of walking down its path for every repetition.
         """
-        if not self.root:
-            return []
-        if not self.root.children:
-            return []
+        if word_list is None:
+            return
+        
+        if not isinstance(word_list, Mapping):
+            word_list = Counter(word.lower() for word in word_list)
         
-        return self._alphabetical_list(self.root)
+        self.bulk_load(word_list)
     
-    # new inner method
-    def _alphabetical_list(self, root):
-        """Inner function to above. Recursively appends the child char to the parent.
+    # new method
+    def bulk_load(self, words):
+        """Inserts many words at once, reusing the path shared with the previous word.
         
         Parameters
         ----------
-        root
-            The root of a trie tree, possibly an internal node for a sub trie tree
+        words : iterable / Mapping
+            Either a Mapping from words to their occurrences, e.g. a Counter, or 
+            an iterable of words. Repeated words that are next to each other are 
+            inserted once with their count, so a sorted iterable inserts every 
+            distinct word exactly once and is never held in memory as a whole.
             
-        Note: having a root parameter is helpful for recursing through the trie by considering
-        a child node has the root of a sub trie.
+        Note: words are converted into lower-case. The nodes of the longest common 
+        prefix with the previous word are reused instead of walking down from the 
+        root, so sorted input only creates or visits the nodes that differ.
         """
+        if isinstance(words, Mapping):
+            # sorting the distinct words makes neighbours share their prefixes
+            counts = sorted((word.lower(), count) for word, count in words.items())
+        else:
+            counts = ((word, sum(1 for _ in group)) for word, group in groupby(word.lower() for word in words))
         
-        lst = [] # initialize empty list
+        self._bulk_insert(counts)
+    
+    # new inner method
+    def _bulk_insert(self, counts):
+        """Inner function to above. Inserts (word, count) pairs, ideally sorted by word."""
+        path = [self.root]
+        previous = ""
         
-        # if the root has children
-        if root.children:
-            children = root.sorted_children() # sort the children list
+        for word, count in counts:
             
-            for child in children:
-                
-                    # for each string accumulated from the bottom-up
-                    for string in self._alphabetical_list(child):
-                        
-                        # this statement appends valid words that don't end at a leaf
-                        if child.valid and child.children and child.char not in lst:
-                            lst.append(child.char)
-                            
-                        # concatenate the child's character to the accumulated string 
-                        lst.append(child.char + string)
-                        
-        
-        # base case: if root (leaf) has no children
-        else:
-            lst.append('')
+            # count the characters shared with the previous word, i.e. nodes already on the path
+            shared = 0
+            limit = min(len(word), len(previous))
+            while shared < limit and word[shared] == previous[shared]:
+                shared += 1
             
-        return lst
+            del path[shared + 1:]
+            self._insert_from(path, word, count)
+            previous = word
     
     # new method
-    def peek_occurrence(self, word):
-        """Determines the occurrence of given word.
+    def merge(self, other):
+        """Adds the words of another trie to this one, summing the occurrences of shared words.
+        
+        Parameters
+        ----------
+        other : Trie / Mapping
+            A trie of any backend, or a Mapping such as a Counter from strings 
+            to their occurrences (converted into lower-case, see bulk_load()).
+        """
+        if isinstance(other, Mapping):
+            self.bulk_load(other)
+        else:
+            # words come out in alphabetical order, so neighbours share their paths
+            self._bulk_insert(other._iter_words(other.root, ""))
+    
+    def insert(self, word, count = 1):
+        """Inserts a word into the trie, creating missing nodes on the go.
         
         Parameters
         ----------
         word : str
-            The word to be peeked in the trie.
-            
-        Returns
-        -------
-        int / bool
-            Returns the occurrence of the word. If word is not valid, return False
-            
-        Note: this is very similar to the lookup() method but instead of checking
-        self.valid it checks self.occurrence.
+            The word to be inserted into the trie.
+        count : int
+            Number of times the word is inserted, 1 by default.
+        """
+        self._insert_from([self.root], word, count)
     
+    # new inner method
+    def _insert_from(self, path, word, count):
+        """Inner function to above. Inserts a word starting from a partial path.
+        
+        Parameters
+        ----------
+        path : list of Nodes
+            The nodes of the first len(path) - 1 characters of the word, starting 
+            with the root. It is extended in place to the last char of the word.
+        word : str
+            The word to be inserted into the trie.
+        count : int
+            Number of times the word is inserted.
         """
-        current_node = self.root
+
+        # iterate through each remaining character of the word
+        current_node = path[-1]
         
-        for i in range(len(word)):    
+        for i in range(len(path) - 1, len(word)): 
+            
+            # check if a child with the new character already exists
+            new_char = word[i]
+            child = current_node.get_child(new_char) 
+            
+            # if child doesn't exist, create new node instance
+            if child is False:
+                new_node = current_node.add_child(new_char) # updates parent and children
+                if self.cache_k:
+                    new_node.top_k = []
+                current_node = new_node
             
-            child = current_node.get_child(word[i])
-            if child != False:
+            # if child exists, continue
+            else:
                 current_node = child
+            
+            path.append(current_node)
         
-        if current_node.valid:
-            return current_node.occurrence
+        # a word gets its id the first time it is inserted, ids are never reused
+        if not current_node.valid:
+            current_node.word_id = self._next_id
+            self._words[self._next_id] = word
+            self._next_id += 1
         
-        return False
+        # the last char of the word means it is a valid word
+        current_node.valid = True
+        # new line: records the occurrences of the word
+        current_node.occurrence += count
+        self._version += 1
+        
+        # raise the bounds on the path bottom-up, an ancestor's bound is never below its child's
+        occurrence = current_node.occurrence
+        for node in reversed(path):
+            if node.best >= occurrence:
+                break
+            node.best = occurrence
+        
+        # every node on the path has the word in its subtree, so refresh their top-k
+        if self.cache_k:
+            for node in path:
+                _update_top_k(node.top_k, word, current_node.occurrence, self.cache_k)
+        
+        if self.result_cache is not None:
+            self.result_cache.invalidate(word)
+        if self.infix_index is not None:
+            self.infix_index.changed.add(word)
     
-    def k_most_common(self, k):
-        """Finds k words inserted into the trie most often.
-
+    # new method
+    def add(self, word, count = 1):
+        """Adds a weighted count to the occurrence of a word.
+        
         Parameters
         ----------
-        k : int
-            Number of most common words to be returned.
-
-        Returns
-        ----------
-        list
-            List of tuples.
-            
-            Each tuple entry consists of the word and its frequency.
-            The entries are sorted by frequency.
-
-        Example
-        -------
-        >>> print(trie.k_most_common(3))
-        [(‘the’, 154), (‘a’, 122), (‘i’, 122)]
-        
-        I.e. the word ‘the’ has appeared 154 times in the inserted text.
-        The second and third most common words both appeared 122 times.
+        word : str
+            The word whose occurrence changes, inserted if it is not in the trie.
+        count : int
+            Added to the occurrence, possibly negative. The word is removed
+            when its occurrence drops to zero or below.
         """
-        if k <= 0 or int(k) != k:
-            return "ERROR: k must be a positive integer"
+        if count > 0:
+            self.insert(word, count)
+            return
         
-        common_words = [] # initialize empty list
-        unique_words = self.alphabetical_list() # find all unique words
+        occurrence = self.peek_occurrence(word)
+        if occurrence is False:
+            return
         
-        if not unique_words:
-            return "ERROR: no valid words to find the k most common words"
+        if occurrence + count <= 0:
+            self.remove(word)
+            return
+        
+        node = self._walk(word)
+        node.occurrence += count
+        self._version += 1
+        self._refresh_best(node)
+        if self.cache_k:
+            self._refresh_top_k(word)
         
-        # peek the occurrence of the word and stores in a tuple
-        for word in unique_words:
-            common_words.append((word, self.peek_occurrence(word)))
+        if self.result_cache is not None:
+            self.result_cache.invalidate(word)
+        if self.infix_index is not None:
+            self.infix_index.changed.add(word)
+    
+    # new method
+    def remove(self, word):
+        """Removes a word from the trie, along with the nodes only it needed.
+        
+        Parameters
+        ----------
+        word : str
+            The word to be removed.
+            
+        Returns
+        ----------
+        int / bool
+            The occurrence the word had, False if it was not in the trie.
+        """
+        occurrence = self.peek_occurrence(word)
+        if occurrence is False:
+            return False
+        
+        node = self._walk(word)
+        node.valid = False
+        node.occurrence = 0
+        del self._words[node.word_id]
+        node.word_id = None
+        self._version += 1
+        self._refresh_best(self._prune(node))
         
-        # sort all words and their occurrences
-        common_words.sort(key=lambda x: x[1], reverse = True)
+        if self.cache_k:
+            self._refresh_top_k(word)
         
-        # if k is way too large
-        if k > len(unique_words):
-            print(f"NOTE: wordbank has {len(unique_words)} < {k} unique words!!")
-            return common_words
+        if self.result_cache is not None:
+            self.result_cache.invalidate(word)
+        if self.infix_index is not None:
+            self.infix_index.changed.add(word)
         
-        # returns the first k words with most occurrences
-        return common_words[:k]
+        return occurrence
     
     # new method
-    def most_common(self, node, prefix):
-        """Finds the most common word with the given prefix.
-
-        You might want to reuse some functionality or ideas from Q4.
-
+    def decay(self, factor):
+        """Ages every occurrence at once, removing the words whose occurrence drops to zero.
+        
         Parameters
         ----------
-        node: Node
-            the last node (char) of the prefix
-        prefix : str
-            The word part to be “autocompleted”.
-
+        factor : float
+            Every occurrence is multiplied by it and rounded down, between 0 and 1.
+            
         Returns
         ----------
-        str
-            The complete, most common word with the given prefix.
-
+        int / str
+            The number of words removed, or an error message for an invalid factor.
         """
-        common_words = [] # initalize empty list
-        unique_words = [prefix + word for word in self._alphabetical_list(node)] # find all unique words with the prefix
+        if not 0 <= factor <= 1:
+            return "ERROR: factor must be between 0 and 1"
         
-        if not node:
-            return "ERROR: no valid words with this prefix"
+        nodes = list(self._iter_nodes(self.root, ""))
+        removed = []
+        
+        for word, node in nodes:
+            if node.valid:
+                node.occurrence = int(node.occurrence * factor)
+                if node.occurrence == 0:
+                    node.valid = False
+                    del self._words[node.word_id]
+                    node.word_id = None
+                    removed.append(node)
+        
+        for node in removed:
+            self._prune(node)
+        self._version += 1
+        
+        # children come before their parent in reverse pre-order, so their bounds and lists are ready
+        for word, node in reversed(nodes):
+            if node.parent is not None or node is self.root:
+                node.best = self._subtree_best(node)
+                if self.cache_k:
+                    node.top_k = self._merge_top_k(node, word)
+        
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        if self.infix_index is not None:
+            self.infix_index.stale = True
         
-        # if the prefix is a valid word itself
+        return len(removed)
+    
+    # new inner method
+    def _prune(self, node):
+        """Detaches the node and its ancestors as long as they are neither valid nor have children.
+        
+        Returns
+        ----------
+        Node
+            The deepest node left on the path, i.e. the last one checked.
+        """
+        while node.parent is not None and not node.valid and not node.children:
+            parent = node.parent
+            del parent.children[node.char[0]]
+            parent._sorted_children = None
+            node.parent = None
+            node = parent
+        
+        return node
+    
+    # new inner method
+    def _refresh_best(self, node):
+        """Lowers the bounds from node up to the root after an occurrence below it decreased,
+        stopping at the first bound that doesn't change."""
+        while node is not None:
+            best = self._subtree_best(node)
+            if best == node.best:
+                break
+            node.best = best
+            node = node.parent
+    
+    # new inner method
+    def _subtree_best(self, node):
+        """Returns the bound of a node from its own occurrence and its children's bounds."""
+        best = node.occurrence if node.valid else 0
+        for child in node.children.values():
+            if child.best > best:
+                best = child.best
+        return best
+    
+    # new inner method
+    def _refresh_top_k(self, word):
+        """Updates the top-k lists on the path of a word whose occurrence decreased.
+        
+        Note: a node's top-k is the top-k of its own word and of its children's lists,
+        so the path is updated bottom-up, stopping at the first list without the word.
+        """
+        path = [self.root]
+        for char in word:
+            child = path[-1].get_child(char)
+            if child is False:
+                break
+            path.append(child)
+        
+        for i in reversed(range(len(path))):
+            node = path[i]
+            if all(cached_word != word for cached_word, _ in node.top_k):
+                break
+            node.top_k = self._merge_top_k(node, word[:i])
+    
+    # new inner method
+    def _merge_top_k(self, node, word):
+        """Returns the top-k list of a node from the lists of its children."""
+        candidates = [child.top_k for child in node.children.values()]
         if node.valid:
-            unique_words.append(prefix)
+            candidates.append([(word, node.occurrence)])
+        return heapq.nsmallest(self.cache_k, chain.from_iterable(candidates), key=_rank_key)
+    
+    def lookup(self, word):
+        """Determines whether a given word is present in the trie.
         
-        # if there are no unique words with this prefix
-        if not unique_words:
-            return "ERROR: no valid words with this prefix"
+        Parameters
+        ----------
+        word : str
+            The word to be looked-up in the trie.
+            
+        Returns
+        -------
+        bool
+            True if the word is present in trie; False otherwise.
+            
+        Notes
+        -----
+        Your trie should ignore whether a word is capitalized.
+        E.g. trie.insert('Prague') should lead to trie.lookup('prague') = True
+        """
+        # convert to lower-case, remove white spaces, replace in-word white spaces with hyphens
+        word = word.lower().strip().replace(" ", "-")
         
-        # append the word and its occurrence for each unique word
-        for word in unique_words:
-            common_words.append((word, self.peek_occurrence(word)))
+        # goes down the trie by iteratively checking if a child exist
+        current_node = self._walk(word)
         
-        # sort them by occurrences
-        common_words.sort(key=lambda x: x[1], reverse = True)
+        # if a child doesn't exist, return False
+        if current_node is False:
+            return False
         
-        # return the first element of the first tuple, i.e. the string of the most common word
-        return common_words[0][0]
-     
-     
+        # return if the last character of the word is a valid word
+        return current_node.valid
+    
     # new method
-    def autocomplete(self, prefix):
-        """Finds the most common word with the given prefix.
-
-        You might want to reuse some functionality or ideas from Q4.
-
+    def alphabetical_list(self):
+        """Delivers the content of the trie in alphabetical order.
+        
+        Returns
+        ----------
+        list
+            List of strings, all words from the trie in alphabetical order.
+        """
+        return list(self.iter_words())
+    
+    # new method
+    def iter_words(self, prefix = ""):
+        """Yields the words of the trie with the given prefix in alphabetical order.
+        
         Parameters
         ----------
         prefix : str
-            The word part to be “autocompleted”.
-
-        Returns
-        ----------
-        str
-            The complete, most common word with the given prefix.
+            Only words starting with this prefix are yielded, all words by default.
             
-        Notes
+        Yields
         ----------
-        The return value is equal to prefix if there is no valid word in the trie.
-        The return value is also equal to prefix if prefix is the most common word.
+        str
+            The next word in alphabetical order. Nothing is yielded if the 
+            prefix does not exist in the trie.
         """
         # convert to lower-case
         prefix = prefix.lower()
         
         # traverse down the tree to the last char of the prefix
+        current_node = self._walk(prefix)
+        if current_node is False:
+            return
+        
+        for word, _ in self._iter_words(current_node, prefix):
+            yield word
+    
+    # new inner method
+    def _walk(self, prefix):
+        """Returns the node of the last char of the prefix, False if the prefix
+        does not exist in the trie.
+        
+        Parameters
+        ----------
+        prefix : str
+            The characters to follow down from the root, already normalized.
+        """
         current_node = self.root
-        for i in range(len(prefix)):    
-            current_node = current_node.get_child(prefix[i])
-            if current_node == False:
-                return "ERROR: prefix does not exist in trie"
         
-        # find the most common words with the alphabetical list from this last char
-        return self.most_common(current_node, prefix)
+        # a plain dict look-up per character, comparing nodes to False would call Node.__eq__
+        for char in prefix:
+            current_node = current_node.children.get(char)
+            if current_node is None:
+                return False
+        
+        return current_node
+    
+    # new inner method
+    def _walk_steps(self, prefix):
+        """Walks like _walk(), for Instrumentation.
+        
+        Returns
+        ----------
+        tuple
+            (node, steps), node as returned by _walk() and steps the number of 
+            child look-ups made, the last one being the failed one if node is False.
+            
+        Note: the _child() of the class is called, since the instance's one may be
+        the counting wrapper of the instrumentation.
+        """
+        child = type(self)._child
+        node = self.root
+        
+        for steps, char in enumerate(prefix, 1):
+            node = child(self, node, char)
+            if node is False:
+                return False, steps
+        
+        return node, len(prefix)
+    
+    # new inner method
+    def _iter_words(self, root, prefix):
+        """Yields (word, occurrence) for every valid word of a subtree in alphabetical order.
+        
+        Parameters
+        ----------
+        root : Node
+            The root of a trie tree, possibly an internal node for a sub trie tree
+        prefix : str
+            The word spelled by the path down to root
+        """
+        for word, node in self._iter_nodes(root, prefix):
+            if node.valid:
+                yield word, node.occurrence
+    
+    # new inner method
+    def _iter_nodes(self, root, prefix):
+        """Walks a subtree depth-first in alphabetical order.
+        
+        Parameters
+        ----------
+        root : Node
+            The root of a trie tree, possibly an internal node for a sub trie tree
+        prefix : str
+            The word spelled by the path down to root
+            
+        Yields
+        ----------
+        tuple
+            (word, node) for root and every node below it, each node before its
+            children, so the valid ones come out in alphabetical order.
+            
+        Note: an explicit stack replaces recursion, so long words can't hit Python's
+        recursion limit and every node is visited exactly once.
+        """
+        stack = [(root, prefix)]
+        
+        while stack:
+            node, word = stack.pop()
+            yield word, node
+            
+            # push in reverse so the alphabetically first child is popped next
+            for child in reversed(node.sorted_children()):
+                stack.append((child, word + child.char))
+    
+    # new method
+    def save(self, path):
+        """Writes the trie to a flat binary file which load() can memory-map.
+        
+        Parameters
+        ----------
+        path : str / path
+            The file to be written, replaced if it exists.
+            
+        Note: nodes are numbered in alphabetical depth-first order with the root as 0
+        and stored as tables of little-endian 32-bit integers: where each node's edges
+        start, the occurrences, the parent and word id of each node, the nodes of the 
+        words in order of their ids, the child of every edge and the alphabet, i.e. 
+        the sorted code points of the characters. The character of every edge follows
+        as its small integer code, its index in the alphabet, sorted within a node, in
+        1 byte for up to 256 characters, else 2 or 4, and finally one valid byte per node.
+        """
+        nodes = [node for _, node in self._iter_nodes(self.root, "")]
+        node_ids = {id(node): i for i, node in enumerate(nodes)} # nodes themselves are unhashable
+        
+        # parents follow the edges, the nodes a ConcurrentTrie shares keep an older parent
+        parent = array("I", repeat(_NO_ID, len(nodes)))
+        for i, node in enumerate(nodes):
+            for child in node.children.values():
+                parent[node_ids[id(child)]] = i
+        
+        _write_tables(path, parent, 
+                      array("I", [0] + [ord(node.char) for node in nodes[1:]]),
+                      array("I", [node.occurrence for node in nodes]),
+                      array("B", [node.valid for node in nodes]),
+                      array("I", [node.word_id if node.valid else _NO_ID for node in nodes]),
+                      self._next_id)
+    
+    # new method
+    @classmethod
+    def load(cls, path, mmap = True, cache_k = None):
+        """Loads a trie written by save().
+        
+        Parameters
+        ----------
+        path : str / path
+            The file written by save().
+        mmap : bool
+            If True (default), the file is memory-mapped and queried in place, 
+            without building any Node. Otherwise a regular Trie is rebuilt.
+        cache_k : int
+            Passed on to the Trie constructor when mmap is False.
+            
+        Returns
+        ----------
+        MappedTrie / Trie
+            A read-only MappedTrie if mmap is True, else a Trie.
+        """
+        mapped = MappedTrie(path, use_mmap = mmap)
+        if mmap:
+            return mapped
+        
+        # the words come out sorted and as stored, like in merge()
+        trie = cls(cache_k = cache_k)
+        trie._bulk_insert(mapped._iter_words(mapped.root, ""))
+        
+        # the insertion numbered the words alphabetically, give them back their ids
+        trie._words = {}
+        trie._next_id = mapped._next_id
+        for word, _ in mapped._iter_words(mapped.root, ""):
+            word_id = mapped.word_id(word)
+            trie._walk(word).word_id = word_id
+            trie._words[word_id] = word
+        
+        mapped.close()
+        return trie
+    
+    # new method
+    def memory_report(self):
+        """Estimates the memory held by the nodes of the trie.
+
+        Counts each node object with its children dict and, when present, its
+        cached sorted children and top-k list. Single characters are left out 
+        since they are shared by the interpreter, longer edge labels are counted.
+
+        Returns
+        ----------
+        dict
+            The number of nodes and valid words, the total bytes, and the
+            bytes per node and per stored word.
+        """
+        nodes = 0
+        words = 0
+        total_bytes = 0
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            words += node.valid
+
+            total_bytes += sys.getsizeof(node) + sys.getsizeof(node.children)
+            if len(node.char) > 1:
+                total_bytes += sys.getsizeof(node.char)
+            if node._sorted_children is not None:
+                total_bytes += sys.getsizeof(node._sorted_children)
+            if node.top_k is not None:
+                total_bytes += sys.getsizeof(node.top_k)
+                total_bytes += sum(sys.getsizeof(entry) for entry in node.top_k)
+
+            stack.extend(node.children.values())
+
+        return {"nodes": nodes,
+                "words": words,
+                "bytes": total_bytes,
+                "bytes_per_node": total_bytes / nodes,
+                "bytes_per_word": total_bytes / words if words else 0}
+
+    # new method
+    def enable_result_cache(self, max_size = 1024, ttl = None):
+        """Caches the results of autocomplete(), top_k_completions() and k_most_common().
+        
+        Parameters
+        ----------
+        max_size : int
+            Maximum number of cached results, the least recently used one is evicted.
+        ttl : float
+            Number of seconds a result stays valid, None (default) for no limit.
+            
+        Returns
+        ----------
+        ResultCache
+            The cache, whose counters are in self.result_cache.stats().
+            
+        Note: results are keyed by the lower-case prefix and k. Inserting or removing 
+        a word only drops the results of its prefixes, the others still hold.
+        """
+        self.result_cache = ResultCache(max_size, ttl)
+        return self.result_cache
+    
+    # new method
+    def enable_instrumentation(self):
+        """Starts measuring the time and the traversal work of every public method call.
+        
+        Returns
+        ----------
+        Instrumentation
+            Its snapshot() returns the statistics collected so far.
+        """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self)
+        return self.instrumentation
+    
+    # new method
+    def disable_instrumentation(self):
+        """Stops measuring, the methods of the trie are the plain ones again."""
+        if self.instrumentation is not None:
+            self.instrumentation.detach()
+            self.instrumentation = None
+    
+    # new method
+    def peek_occurrence(self, word):
+        """Determines the occurrence of given word.
+        
+        Parameters
+        ----------
+        word : str
+            The word to be peeked in the trie.
+            
+        Returns
+        -------
+        int / bool
+            Returns the occurrence of the word. If word is not valid, return False
+            
+        Note: this is very similar to the lookup() method but instead of checking
+        self.valid it checks self.occurrence.
+    
+        """
+        current_node = self._walk(word)
+        
+        # a missing character means the word is not in the trie
+        if current_node is not False and current_node.valid:
+            return current_node.occurrence
+        
+        return False
+    
+    # new method
+    def word_id(self, word):
+        """Returns the integer id of a word.
+        
+        Ids are given in order of first insertion, starting at 0, and a word keeps 
+        its id until it is removed, including through save() and load(). The words
+        of one bulk_load(), e.g. of the word_list of the constructor, are inserted 
+        in alphabetical order, so their ids follow it. The id of a removed word is 
+        never given again, so downstream systems can key their data by id instead 
+        of by string, and only the ids of the words in the trie take memory.
+        
+        Parameters
+        ----------
+        word : str
+            The word, as inserted.
+            
+        Returns
+        -------
+        int / bool
+            The id of the word. If word is not valid, return False
+        """
+        current_node = self._walk(word)
+        if current_node is not False and current_node.valid:
+            return current_node.word_id
+        return False
+    
+    # new method
+    def word_of(self, word_id):
+        """Returns the word with the given id, see word_id().
+        
+        Parameters
+        ----------
+        word_id : int
+            The id of the word.
+            
+        Returns
+        -------
+        str / bool
+            The word. If no word in the trie has the id, e.g. it was removed, return False
+        """
+        word = self._words.get(word_id)
+        if word is None:
+            return False
+        
+        # ConcurrentTrie snapshots share the ids of words inserted later on, so check the node
+        current_id = self.word_id(word)
+        if current_id is not False and current_id == word_id:
+            return word
+        return False
+    
+    @_cached_result
+    def k_most_common(self, k):
+        """Finds k words inserted into the trie most often.
+
+        Parameters
+        ----------
+        k : int
+            Number of most common words to be returned.
+
+        Returns
+        ----------
+        list
+            List of tuples.
+            
+            Each tuple entry consists of the word and its frequency.
+            The entries are sorted by frequency.
+
+        Example
+        -------
+        >>> print(trie.k_most_common(3))
+        [(‘the’, 154), (‘a’, 122), (‘i’, 122)]
+        
+        I.e. the word ‘the’ has appeared 154 times in the inserted text.
+        The second and third most common words both appeared 122 times.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        # a single pass over the trie with a heap of at most k words
+        common_words = self._top_k(self.root, "", k)
+        
+        if not common_words:
+            return "ERROR: no valid words to find the k most common words"
+        
+        # if k is way too large, every unique word was returned
+        if k > len(common_words):
+            print(f"NOTE: wordbank has {len(common_words)} < {k} unique words!!")
+        
+        # returns the k words with most occurrences
+        return common_words
+    
+    # new inner method
+    def _top_k(self, node, prefix, k):
+        """Finds the k most common words of a subtree in one traversal.
+        
+        Parameters
+        ----------
+        node : Node
+            The root of the subtree, i.e. the last node (char) of the prefix
+        prefix : str
+            The word spelled by the path down to node
+        k : int
+            Number of words to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (word, occurrence) tuples sorted by occurrence, ties broken
+            alphabetically, which is the order k_most_common() has always had.
+            
+        Note: a best-first search on the highest occurrence below each node, see 
+        _best_first(), so only the subtrees that may hold one of the k words are
+        visited, instead of every node below the prefix.
+        """
+        return self._best_first(node, self._word_at(node, prefix), k, Scorer())
+    
+    # new method
+    def top_k_scored(self, prefix, k, scorer):
+        """Finds the k words with the given prefix which score highest.
+        
+        Parameters
+        ----------
+        prefix : str
+            The word part to be “autocompleted”.
+        k : int
+            Number of completions to be returned.
+        scorer : Scorer
+            Scores the words and bounds the scores of subtrees, e.g. a WeightedScorer.
+            
+        Returns
+        ----------
+        list
+            List of (word, score) tuples sorted by score, ties broken 
+            alphabetically. Fewer than k tuples if the prefix has fewer 
+            completions.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        # convert to lower-case
+        prefix = prefix.lower()
+        
+        node, word = self._prefix_root(prefix)
+        if node is False:
+            return "ERROR: prefix does not exist in trie"
+        
+        return self._best_first(node, word, k, scorer)
+    
+    # new inner method
+    def _best_first(self, node, word, k, scorer):
+        """Finds the k words of a subtree which score highest, by branch and bound.
+        
+        Parameters
+        ----------
+        node : Node
+            The root of the subtree.
+        word : str
+            The word spelled by the path down to node.
+        k : int
+            Number of words to be returned.
+        scorer : Scorer
+            Scores the words and bounds the scores of the subtrees.
+            
+        Note: the heap holds words and subtrees, a subtree ranked by its bound and its 
+        word, which no word below it comes before, so a word reaching the top of the 
+        heap outranks everything left. Meanwhile the k best scores found so far are 
+        kept, and a subtree whose bound is below the k-th of them is never pushed.
+        """
+        # (-score, word, 0 for a word or 1 for a subtree, tie breaker, node)
+        heap = [(-scorer.bound(word, self._node_best(node)), word, 1, 0, node)]
+        pushed = 1
+        found = [] # the k best scores found so far, lowest first
+        ranked = []
+        
+        while heap and len(ranked) < k:
+            negative_score, word, is_subtree, _, node = heapq.heappop(heap)
+            if not is_subtree:
+                ranked.append((word, -negative_score))
+                continue
+            
+            occurrence = self._node_occurrence(node)
+            if occurrence is not False:
+                score = scorer.score(word, occurrence)
+                heapq.heappush(heap, (-score, word, 0, pushed, None))
+                pushed += 1
+                
+                if len(found) < k:
+                    heapq.heappush(found, score)
+                elif score > found[0]:
+                    heapq.heapreplace(found, score)
+            
+            for label, child in self._children(node):
+                child_word = word + label
+                bound = scorer.bound(child_word, self._node_best(child))
+                
+                # k words already score higher than anything below the child
+                if len(found) == k and bound < found[0]:
+                    continue
+                
+                heapq.heappush(heap, (-bound, child_word, 1, pushed, child))
+                pushed += 1
+        
+        return ranked
+    
+    # new inner method
+    def _word_at(self, node, prefix):
+        """Returns the word spelled by the path down to the node reached by walking the prefix."""
+        return prefix
+    
+    # new method
+    def most_common(self, node, prefix):
+        """Finds the most common word with the given prefix.
+
+        You might want to reuse some functionality or ideas from Q4.
+
+        Parameters
+        ----------
+        node: Node
+            the last node (char) of the prefix
+        prefix : str
+            The word part to be “autocompleted”.
+
+        Returns
+        ----------
+        str
+            The complete, most common word with the given prefix.
+
+        """
+        if node is False or node is None:
+            return "ERROR: no valid words with this prefix"
+        
+        # the two most common words are enough to break a tie with the prefix itself
+        common_words = self._top_k(node, prefix, 2)
+        
+        # return the string of the most common word, the prefix if the trie is empty
+        return _best_completion(common_words, prefix)
+     
+     
+    # new method
+    @_cached_result
+    def autocomplete(self, prefix):
+        """Finds the most common word with the given prefix.
+
+        You might want to reuse some functionality or ideas from Q4.
+
+        Parameters
+        ----------
+        prefix : str
+            The word part to be “autocompleted”.
+
+        Returns
+        ----------
+        str
+            The complete, most common word with the given prefix.
+            
+        Notes
+        ----------
+        The return value is equal to prefix if there is no valid word in the trie.
+        The return value is also equal to prefix if prefix is the most common word.
+        """
+        # convert to lower-case
+        prefix = prefix.lower()
+        
+        # traverse down the tree to the last char of the prefix
+        current_node = self._walk(prefix)
+        if current_node is False:
+            return "ERROR: prefix does not exist in trie"
+        
+        return self._autocomplete_node(current_node, prefix)
+    
+    # new inner method
+    def _autocomplete_node(self, node, prefix):
+        """Inner function to above, once the node of the last char of the prefix is found."""
+        # with the cache, the two best completions are enough to break a tie with the prefix
+        if self.cache_k and self.cache_k >= 2:
+            return _best_completion(node.top_k, prefix)
+        
+        # find the most common words with the alphabetical list from this last char
+        return self.most_common(node, prefix)
+    
+    # new method
+    @_cached_result
+    def top_k_completions(self, prefix, k):
+        """Finds the k most common words with the given prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            The word part to be “autocompleted”.
+        k : int
+            Number of completions to be returned.
+
+        Returns
+        ----------
+        list
+            List of (word, occurrence) tuples sorted by occurrence, ties 
+            broken alphabetically. Fewer than k tuples if the prefix has
+            fewer completions.
+            
+        Notes
+        ----------
+        With cache_k >= k this only walks down the prefix; otherwise every
+        word below the prefix is ranked.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        # convert to lower-case
+        prefix = prefix.lower()
+        
+        # traverse down the tree to the last char of the prefix
+        current_node = self._walk(prefix)
+        if current_node is False:
+            return "ERROR: prefix does not exist in trie"
+        
+        return self._completions(current_node, prefix, k)
+    
+    # new method
+    def completions(self, prefix = "", order = "alpha", page_size = 10, token = None):
+        """Returns one page of the words with the given prefix, and a token to get the next one.
+        
+        Parameters
+        ----------
+        prefix : str
+            The word part to be “autocompleted”.
+        order : str
+            "alpha" for alphabetical order, "freq" for the most common words first, 
+            ties broken alphabetically.
+        page_size : int
+            Number of words per page.
+        token : tuple / None
+            The token returned with the previous page, None (default) for the first 
+            page. It carries the prefix and the order of the first page, which 
+            override the arguments.
+            
+        Returns
+        ----------
+        tuple
+            (page, token): the list of (word, occurrence) tuples of the page and 
+            the token of the next page, None after the last page.
+            
+        Notes
+        ----------
+        The traversal behind a page is kept for the next one, up to max_cursors 
+        of them, until the trie changes. Otherwise the token is enough to resume: 
+        in alphabetical order it walks down to the last word and continues from 
+        there, by frequency it ranks the words again but skips those already 
+        returned. Either way only a page of words is built at a time.
+        """
+        if page_size <= 0 or int(page_size) != page_size:
+            return "ERROR: page_size must be a positive integer"
+        
+        if token is not None:
+            order, prefix = token[0], token[1]
+        elif order not in ("alpha", "freq"):
+            return "ERROR: order must be 'alpha' or 'freq'"
+        
+        prefix = prefix.lower()
+        if self._cursors is None:
+            self._cursors = OrderedDict()
+        
+        # continue the traversal of the previous page if the trie has not changed since
+        cursor = self._cursors.pop(token, None) if token is not None else None
+        if cursor is not None and cursor[0] == self._version:
+            page = [cursor[1]]
+            words = cursor[2]
+        else:
+            node, word = self._prefix_root(prefix)
+            if node is False:
+                return "ERROR: prefix does not exist in trie"
+            
+            after = token[2:] if token is not None else None
+            if order == "alpha":
+                words = self._alphabetical_after(node, word, after)
+            else:
+                words = self._ranked_after(node, word, after)
+            page = []
+        
+        page.extend(islice(words, page_size - len(page)))
+        
+        # the first word of the next page tells whether there is one
+        following = next(words, None)
+        if following is None:
+            return page, None
+        
+        word, occurrence = page[-1]
+        token = (order, prefix, word, occurrence)
+        
+        self._cursors[token] = (self._version, following, words)
+        if len(self._cursors) > self.max_cursors:
+            self._cursors.popitem(last = False)
+        
+        return page, token
+    
+    # new inner method
+    def _prefix_root(self, prefix):
+        """Returns (node, word): the root of the subtree of the words with the prefix and 
+        the word it spells, node being False if the prefix does not exist in the trie."""
+        return self._walk(prefix), prefix
+    
+    # new inner method
+    def _alphabetical_after(self, node, word, after):
+        """Yields (word, occurrence) for the valid words of a subtree in alphabetical order.
+        
+        Parameters
+        ----------
+        node : Node
+            The root of the subtree.
+        word : str
+            The word spelled by the path down to node.
+        after : tuple / None
+            (word, occurrence) of the last word already returned, only the words after
+            it are yielded. None to yield all of them.
+        """
+        stack = []
+        
+        if after is None or word > after[0]:
+            stack.append((node, word))
+        else:
+            # walk down to the last word, keeping the subtrees of the words after it
+            last = after[0]
+            while node is not None:
+                below = None
+                greater = []
+                for label, child in self._children(node):
+                    child_word = word + label
+                    if child_word > last:
+                        greater.append((child, child_word))
+                    elif last.startswith(child_word):
+                        below = child, child_word
+                
+                # deeper words come first, so they are pushed last
+                stack.extend(reversed(greater))
+                node, word = below if below is not None else (None, None)
+        
+        while stack:
+            node, word = stack.pop()
+            occurrence = self._node_occurrence(node)
+            if occurrence is not False:
+                yield word, occurrence
+            
+            # push in reverse so the alphabetically first child is popped next
+            for label, child in reversed(list(self._children(node))):
+                stack.append((child, word + label))
+    
+    # new inner method
+    def _ranked_after(self, node, word, after):
+        """Yields (word, occurrence) for the valid words of a subtree, most common first.
+        
+        Parameters are the same as for _alphabetical_after().
+            
+        Note: a best-first search, whose heap holds both words and subtrees. A subtree 
+        is ranked by its bound, the highest occurrence below it, and by its word, which
+        no word below it comes before, so no word below it outranks it. Subtrees are
+        only expanded once they reach the top of the heap.
+        """
+        after = (-after[1], after[0]) if after is not None else None
+        
+        # (-occurrence, word, 0 for a word or 1 for a subtree, tie breaker, node)
+        heap = [(-self._node_best(node), word, 1, 0, node)]
+        pushed = 1
+        
+        while heap:
+            rank, word, is_subtree, _, node = heapq.heappop(heap)
+            if not is_subtree:
+                yield word, -rank
+                continue
+            
+            occurrence = self._node_occurrence(node)
+            if occurrence is not False and (after is None or (-occurrence, word) > after):
+                heapq.heappush(heap, (-occurrence, word, 0, pushed, None))
+                pushed += 1
+            
+            for label, child in self._children(node):
+                heapq.heappush(heap, (-self._node_best(child), word + label, 1, pushed, child))
+                pushed += 1
+    
+    # new inner method
+    def _node_best(self, node):
+        """Returns the highest occurrence in the subtree of node."""
+        return node.best
+    
+    # new inner method
+    def _completions(self, node, prefix, k):
+        """Inner function to above, once the node of the last char of the prefix is found."""
+        # the precomputed list is already ranked
+        if self.cache_k and k <= self.cache_k:
+            return node.top_k[:k]
+        
+        # otherwise rank all the words with the prefix
+        return self._top_k(node, prefix, k)
+    
+    # new method
+    def lookup_many(self, words):
+        """Determines for each of the given words whether it is present in the trie.
+        
+        Parameters
+        ----------
+        words : list
+            The words to be looked-up, normalized like in lookup().
+            
+        Returns
+        -------
+        list
+            List of bools in the order of the input words, same as calling lookup()
+            on each word.
+        """
+        # convert to lower-case, remove white spaces, replace in-word white spaces with hyphens
+        words = [word.lower().strip().replace(" ", "-") for word in words]
+        
+        results = [False] * len(words)
+        for i, node in self._walk_many(words):
+            if node is not False:
+                results[i] = self._node_occurrence(node) is not False
+        
+        return results
+    
+    # new method
+    def autocomplete_many(self, prefixes, k = 1):
+        """Autocompletes many prefixes at once.
+        
+        Parameters
+        ----------
+        prefixes : list
+            The word parts to be “autocompleted”, converted into lower-case.
+        k : int
+            Number of completions per prefix.
+            
+        Returns
+        -------
+        list
+            In the order of the input prefixes, the same as autocomplete() for k = 1, 
+            else the same as top_k_completions() with k.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        # convert to lower-case
+        prefixes = [prefix.lower() for prefix in prefixes]
+        
+        results = [None] * len(prefixes)
+        previous_prefix = None
+        
+        for i, node in self._walk_many(prefixes):
+            prefix = prefixes[i]
+            
+            # the same prefix comes in a row after sorting, so it is only ranked once
+            if prefix == previous_prefix:
+                results[i] = results[previous_i][:]
+                continue
+            
+            if node is False:
+                results[i] = "ERROR: prefix does not exist in trie"
+            elif k == 1:
+                results[i] = self._autocomplete_node(node, prefix)
+            else:
+                results[i] = self._completions(node, prefix, k)
+            
+            previous_prefix, previous_i = prefix, i
+        
+        return results
+    
+    # new inner method
+    def _walk_many(self, words):
+        """Walks down to the last char of many words, sharing their common prefixes.
+        
+        Parameters
+        ----------
+        words : list
+            The normalized words or prefixes.
+            
+        Yields
+        ----------
+        tuple
+            (index, node) for each word in alphabetical order, node being False if 
+            the word does not exist in the trie.
+            
+        Note: path holds the nodes of the previous word, so only the characters 
+        after the prefix shared with the previous word are walked.
+        """
+        path = [self.root]
+        previous = ""
+        
+        for i in sorted(range(len(words)), key=words.__getitem__):
+            word = words[i]
+            
+            # keep the nodes shared with the previous word, as far as they exist
+            shared = 0
+            limit = min(len(word), len(path) - 1)
+            while shared < limit and word[shared] == previous[shared]:
+                shared += 1
+            del path[shared + 1:]
+            
+            node = path[-1]
+            for char in word[shared:]:
+                node = self._child(node, char)
+                if node is False:
+                    break
+                path.append(node)
+            
+            previous = word
+            yield i, node
+    
+    # new inner method
+    def _child(self, node, char):
+        """Returns the child of node for char, False if there is none."""
+        return node.children.get(char, False)
+    
+    # new inner method
+    def _node_occurrence(self, node):
+        """Returns the occurrence of the word ending at node, False if it is not valid."""
+        if node.valid:
+            return node.occurrence
+        return False
+    
+    # new inner method
+    def _children(self, node):
+        """Yields (label, child) for the children of node in alphabetical order, the
+        label being the characters on the edge to the child."""
+        for child in node.sorted_children():
+            yield child.char, child
+    
+    # new method
+    def fuzzy_autocomplete(self, prefix, max_edits = 1, k = 5):
+        """Finds the most common words whose beginning is within a few typos of the prefix.
+        
+        Parameters
+        ----------
+        prefix : str
+            The word part to be “autocompleted”, possibly mistyped.
+        max_edits : int
+            Maximum number of inserted, deleted or substituted characters.
+        k : int
+            Number of completions to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (word, occurrence, edits) tuples, sorted by edits, then by 
+            occurrence, then alphabetically. edits is the smallest edit distance
+            between the prefix and a beginning of the word. Empty if nothing is 
+            close enough.
+            
+        Note: the trie is walked with one row of the Levenshtein table per character,
+        of which only the band of 2 * max_edits + 1 entries around the diagonal is 
+        computed, and a branch is dropped as soon as its row can't lead to a match 
+        with fewer edits than found above it, nor within max_edits.
+        A node where the whole prefix matches with fewer edits than anywhere above it
+        contributes the top-k completions of its subtree. Those are ranked level by 
+        level of edits, and the search stops at the first level with k words in total,
+        starting over with a larger budget of edits only if needed.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        if max_edits < 0 or int(max_edits) != max_edits:
+            return "ERROR: max_edits must be a non-negative integer"
+        
+        # convert to lower-case
+        prefix = prefix.lower()
+        
+        # allowing fewer edits prunes far more, and if that already finds k words,
+        # words that need more edits can't make the top k
+        for budget in range(max_edits + 1):
+            found = {}
+            matches = self._fuzzy_matches(prefix, budget)
+            
+            # rank level by level of edits, a word keeps the fewest edits it was found with
+            for i, (edits, node, word) in enumerate(matches):
+                for completion, occurrence in self._completions(node, word, k):
+                    if completion not in found:
+                        found[completion] = (completion, occurrence, edits)
+                
+                # words found further down the list need more edits, so they can't make the top k
+                end_of_level = i + 1 == len(matches) or matches[i + 1][0] > edits
+                if end_of_level and len(found) >= k:
+                    break
+            
+            if len(found) >= k:
+                break
+        
+        return sorted(found.values(), key=lambda entry: (entry[2], -entry[1], entry[0]))[:k]
+    
+    # new inner method
+    def _fuzzy_matches(self, prefix, max_edits):
+        """Inner function to above. Finds the nodes where the whole prefix matches.
+        
+        Parameters
+        ----------
+        prefix : str
+            The normalized prefix.
+        max_edits : int
+            Maximum number of inserted, deleted or substituted characters.
+            
+        Returns
+        ----------
+        list
+            List of (edits, node, word) tuples sorted by edits, for every node that
+            matches the prefix with fewer edits than all of its ancestors.
+        """
+        # edits between the prefix and the word down to each node, row by row, where
+        # anything above max_edits is capped since it can only rule a branch out
+        n = len(prefix)
+        cap = max_edits + 1
+        row = [min(j, cap) for j in range(n + 1)]
+        matches = []
+        if row[-1] <= max_edits:
+            matches.append((row[-1], self.root, ""))
+        
+        stack = [(self.root, "", row, row[-1])]
+        while stack:
+            node, word, row, best = stack.pop()
+            
+            for label, child in self._children(node):
+                new_row = row
+                edits = best
+                depth = len(word)
+                
+                for char in label:
+                    depth += 1
+                    previous_row = new_row
+                    new_row = [min(depth, cap)] + [cap] * n
+                    
+                    # entries further than max_edits from the diagonal are above max_edits anyway
+                    for j in range(max(1, depth - max_edits), min(n, depth + max_edits) + 1):
+                        new_row[j] = min(new_row[j - 1] + 1,
+                                         previous_row[j] + 1,
+                                         previous_row[j - 1] + (prefix[j - 1] != char),
+                                         cap)
+                    
+                    # no entry of a row is below the smallest entry of the row above it,
+                    # so the rest of the branch can't match with fewer edits than now
+                    edits = min(edits, new_row[-1])
+                    lowest = min(new_row)
+                    if lowest >= edits:
+                        break
+                
+                # only record nodes that match better than their ancestors
+                if edits < best and edits <= max_edits:
+                    matches.append((edits, child, word + label))
+                
+                if lowest < edits:
+                    stack.append((child, word + label, new_row, edits))
+        
+        matches.sort(key=lambda match: match[0])
+        return matches
+    
+    # new method
+    def infix_search(self, fragment, k = 5):
+        """Finds the k most common words containing the fragment anywhere, not only at the start.
+        
+        Parameters
+        ----------
+        fragment : str
+            The characters to be found, e.g. "speare" for "shakespeare".
+        k : int
+            Number of words to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (word, occurrence) tuples sorted by occurrence, ties 
+            broken alphabetically. Fewer than k tuples if fewer words 
+            contain the fragment.
+            
+        Notes
+        ----------
+        Without enable_infix_index() every word of the trie is scanned. With it, 
+        the words changed since the index was built are checked one by one, and 
+        the index is rebuilt once there are too many of them, see InfixIndex.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        # convert to lower-case
+        fragment = fragment.lower()
+        
+        if self.infix_index is None:
+            words = self._iter_words(self.root, "")
+            matches = heapq.nsmallest(k, (item for item in words if fragment in item[0]), key=_rank_key)
+        else:
+            if self.infix_index.needs_rebuild():
+                self.enable_infix_index()
+            matches = self.infix_index.search(fragment, k)
+            
+            # the index ranks the other words as before, so the k best of both are the k best
+            if self.infix_index.changed:
+                changed = ((word, self.peek_occurrence(word)) for word in self.infix_index.changed if fragment in word)
+                matches = heapq.nsmallest(k, chain(matches, (item for item in changed if item[1] is not False)), key=_rank_key)
+        
+        if not matches:
+            return "ERROR: fragment does not exist in trie"
+        
+        return matches
+    
+    # new method
+    def enable_infix_index(self):
+        """Builds the index of infix_search() from the words of the trie and their occurrences.
+        
+        Returns
+        ----------
+        InfixIndex
+            The index, which is rebuilt after the trie changes.
+        """
+        self.infix_index = InfixIndex(self._iter_words(self.root, ""))
+        return self.infix_index
+
+
+class RadixNode(Node):
+    """This class represents one node of a radix (path-compressed) trie.
+    
+    Same as a Node, except that self.char holds the whole label of the edge from
+    the parent, i.e. possibly several characters, and children are keyed by the
+    first character of their label.
+    
+    Parameters
+    ----------
+    self.depth --> int
+        the length of the word spelled by the path down to and including this node
+    """
+    
+    __slots__ = ("depth",)
+    
+    def __init__(self, label, depth = 0):
+        """Creates the RadixNode instance.
+        
+        Parameters
+        ----------
+        label : str
+            The characters of the edge from the parent
+        depth : int
+            The length of the word spelled down to and including the label
+        """
+        super().__init__(label)
+        self.depth = depth
+
+
+class RadixTrie(Trie):
+    """This class represents a radix trie, an alternative backend of Trie.
+    
+    Chains of nodes with a single child are merged into one edge labelled with all
+    of their characters, so a long, rare word costs one node instead of one node
+    per character. It offers the same methods as a Trie, except for the cache_k mode.
+    
+    Parameters
+    ----------
+    self.root --> RadixNode
+        the root node with an empty label
+    """
+    
+    def __init__(self, word_list = None, cache_k = None):
+        """Creates the RadixTrie instance, inserts initial words if provided.
+        
+        Parameters
+        ----------
+        word_list : list / Mapping
+            List of strings to be inserted into the trie upon creation, or a 
+            Mapping such as a Counter from strings to their occurrences.
+        cache_k : None
+            Only there for the classmethods shared with Trie, the precomputed 
+            top-k cache is not supported by this backend.
+        """
+        if cache_k:
+            raise ValueError("RadixTrie does not support cache_k")
+        self.cache_k = None
+        self.root = RadixNode("")
+        self._words = {}
+        self._next_id = 0
+        self.tree = self.create_trie(word_list)
+    
+    def _insert_from(self, path, word, count):
+        """Inserts a word into the trie, splitting an edge if the word leaves it halfway.
+        
+        Note: bulk_load() hands over the nodes shared with the previous word, but 
+        they are per character, so the radix trie always starts from the root.
+        """
+        node = self.root
+        i = 0
+        
+        while i < len(word):
+            child = node.children.get(word[i])
+            
+            # no edge starts with the next character: the rest of the word is a new leaf
+            if child is None:
+                child = RadixNode(word[i:], len(word))
+                child.parent = node
+                node.children[word[i]] = child
+                node._sorted_children = None
+                node = child
+                break
+            
+            # count the characters the word shares with the edge label
+            label = child.char
+            common = 0
+            limit = min(len(label), len(word) - i)
+            while common < limit and label[common] == word[i + common]:
+                common += 1
+            
+            # the word leaves the edge halfway: split it into two edges
+            if common < len(label):
+                middle = RadixNode(label[:common], child.depth - len(label) + common)
+                middle.best = child.best
+                middle.parent = node
+                node.children[word[i]] = middle
+                node._sorted_children = None
+                
+                child.char = label[common:]
+                child.parent = middle
+                middle.children[child.char[0]] = child
+                child = middle
+            
+            node = child
+            i += common
+        
+        if not node.valid:
+            node.word_id = self._next_id
+            self._words[self._next_id] = word
+            self._next_id += 1
+        
+        node.valid = True
+        node.occurrence += count
+        self._version += 1
+        
+        # a RadixTrie never shares its nodes, so the parents lead up the path of the word
+        occurrence = node.occurrence
+        while node is not None and node.best < occurrence:
+            node.best = occurrence
+            node = node.parent
+        
+        if self.result_cache is not None:
+            self.result_cache.invalidate(word)
+        if self.infix_index is not None:
+            self.infix_index.changed.add(word)
+    
+    def _prune(self, node):
+        """Detaches dead nodes like Trie._prune(), then merges the deepest node left 
+        into its child if it is only a pass-through, so every edge stays maximal.
+        
+        Note: the merged node keeps its old bound, which may be too high, so that 
+        _refresh_best() sees it change and goes on lowering the bounds above it.
+        """
+        while True:
+            node = super()._prune(node)
+            if node.parent is None or node.valid or len(node.children) != 1:
+                return node
+            
+            # the child may be dead too, which the next round prunes
+            (child,) = node.children.values()
+            node.char += child.char
+            node.depth = child.depth
+            node.valid = child.valid
+            node.occurrence = child.occurrence
+            node.word_id = child.word_id
+            node.children = child.children
+            node._sorted_children = None
+            for grandchild in node.children.values():
+                grandchild.parent = node
+            child.parent = None
+    
+    def _walk(self, prefix):
+        """Returns the node whose subtree holds exactly the words with the prefix,
+        False if the prefix does not exist in the trie.
+        
+        Note: the prefix may end halfway through an edge, in which case the node
+        below that edge spells a longer word than the prefix.
+        """
+        node = self.root
+        i = 0
+        
+        while i < len(prefix):
+            child = node.children.get(prefix[i])
+            if child is None:
+                return False
+            
+            # the rest of the prefix has to follow the label, as far as both go
+            label = child.char
+            if not label.startswith(prefix[i:i + len(label)]):
+                return False
+            
+            node = child
+            i += len(label)
+        
+        return node
+    
+    def _walk_steps(self, prefix):
+        """Walks like _walk(), counting one step per edge, see Trie._walk_steps()."""
+        node = self.root
+        i = 0
+        steps = 0
+        
+        while i < len(prefix):
+            steps += 1
+            child = node.children.get(prefix[i])
+            if child is None:
+                return False, steps
+            
+            label = child.char
+            if not label.startswith(prefix[i:i + len(label)]):
+                return False, steps
+            
+            node = child
+            i += len(label)
+        
+        return node, steps
+    
+    def _iter_words(self, root, prefix):
+        """Yields (word, occurrence) for every valid word of a subtree in alphabetical order.
+        
+        Note: the prefix may end halfway through the label of root, see _word_at().
+        """
+        return Trie._iter_words(self, root, self._word_at(root, prefix))
+    
+    def _prefix_root(self, prefix):
+        """Returns (node, word) for the words with the prefix, see Trie._prefix_root()."""
+        node = self._walk(prefix)
+        if node is False:
+            return False, prefix
+        return node, self._word_at(node, prefix)
+    
+    def _word_at(self, node, prefix):
+        """Returns the word spelled down to the node, see Trie._word_at().
+        
+        Note: the prefix may end halfway through the label of the node, so the word 
+        is rebuilt from the part of the prefix above it and its full label.
+        """
+        return prefix[:node.depth - len(node.char)] + node.char
+    
+    def _walk_many(self, words):
+        """Walks down to each of the words in alphabetical order, see Trie._walk_many()."""
+        for i in sorted(range(len(words)), key=words.__getitem__):
+            yield i, self._walk(words[i])
+    
+    def lookup(self, word):
+        """Determines whether a given word is present in the trie, see Trie.lookup()."""
+        # convert to lower-case, remove white spaces, replace in-word white spaces with hyphens
+        word = word.lower().strip().replace(" ", "-")
+        return self.peek_occurrence(word) is not False
+    
+    def lookup_many(self, words):
+        """Determines for each of the given words whether it is present in the trie."""
+        return [self.lookup(word) for word in words]
+    
+    def peek_occurrence(self, word):
+        """Determines the occurrence of given word, False if it is not valid."""
+        node = self._walk(word)
+        
+        # a word ending halfway through an edge is only a prefix
+        if node is not False and node.depth == len(word) and node.valid:
+            return node.occurrence
+        return False
+    
+    def save(self, path):
+        """Writes the trie to the same file format as Trie.save(), one node per character.
+        
+        Note: the tables are filled straight from the labels, every character but the 
+        last of a label becomes a node that only leads on, so no Node is created.
+        """
+        parent = array("I", [_NO_ID])
+        chars = array("I", [0])
+        occurrence = array("I", [self.root.occurrence])
+        valid = array("B", [self.root.valid])
+        node_word = array("I", [self.root.word_id if self.root.valid else _NO_ID])
+        
+        stack = [(child, 0) for child in reversed(self.root.sorted_children())]
+        while stack:
+            node, up = stack.pop()
+            for i, char in enumerate(node.char, 1 - len(node.char)):
+                parent.append(up)
+                chars.append(ord(char))
+                
+                # i reaches 0 at the last character, the one of the node itself
+                ends_word = i == 0 and node.valid
+                occurrence.append(node.occurrence if i == 0 else 0)
+                valid.append(ends_word)
+                node_word.append(node.word_id if ends_word else _NO_ID)
+                up = len(parent) - 1
+            
+            stack.extend((child, up) for child in reversed(node.sorted_children()))
+        
+        _write_tables(path, parent, chars, occurrence, valid, node_word, self._next_id)
+    
+    def word_id(self, word):
+        """Returns the integer id of a word, see Trie.word_id()."""
+        node = self._walk(word)
+        if node is not False and node.depth == len(word) and node.valid:
+            return node.word_id
+        return False
+
+
+class MappedTrie(Trie):
+    """This class represents a read-only trie queried straight from a file written by Trie.save().
+    
+    Nodes are integer ids into the tables of the file instead of Node objects, so 
+    opening the file costs nothing, and worker processes mapping the same file share
+    one page-cached copy. It supports every query of a Trie and save(), but no 
+    insertions.
+    
+    Parameters
+    ----------
+    self.root --> int
+        the id of the root node, always 0
+    self._path --> str / path
+        the file the trie is read from
+    self.cache_k --> None
+        there are no precomputed completions in the file
+    self._first_edge, self._occurrence, self._parent, self._node_word, self._word_node,
+    self._edge_child, self._alphabet, self._edge_code, self._valid
+        the tables of the file, as views on the mapped memory
+    self._chars, self._codes --> list of str, dict of str: int
+        the character of each code of the alphabet and the code of each character
+    """
+    
+    def __init__(self, path, use_mmap = True):
+        """Opens the file and checks its header.
+        
+        Parameters
+        ----------
+        path : str / path
+            The file written by Trie.save().
+        use_mmap : bool
+            If True (default), memory-maps the file, else reads it into memory.
+        """
+        self.root = 0
+        self.cache_k = None
+        self._path = path
+        
+        with open(path, "rb") as fileobj:
+            if use_mmap:
+                self._buffer = mmap.mmap(fileobj.fileno(), 0, access = mmap.ACCESS_READ)
+            else:
+                self._buffer = fileobj.read()
+        
+        magic, version = struct.unpack_from("<4sI", self._buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trie file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        _, _, n_nodes, n_edges, n_chars, n_words, self._next_id = _HEADER.unpack_from(self._buffer)
+        
+        self._view = memoryview(self._buffer)
+        self._offset = _HEADER.size
+        self._tables = []
+        self._first_edge = self._table("I", n_nodes + 1)
+        self._occurrence = self._table("I", n_nodes)
+        self._parent = self._table("I", n_nodes)
+        self._node_word = self._table("I", n_nodes)
+        self._word_node = self._table("I", n_words)
+        self._edge_child = self._table("I", n_edges)
+        self._alphabet = self._table("I", n_chars)
+        self._edge_code = self._table(_code_typecode(n_chars), n_edges)
+        self._valid = self._table("B", n_nodes)
+        
+        self._best = None # see _node_best()
+        
+        # queries come in as characters, the alphabet is small enough to decode at once
+        self._chars = [chr(code_point) for code_point in self._alphabet]
+        self._codes = {char: code for code, char in enumerate(self._chars)}
+    
+    def __repr__(self):
+        """Overrides the defauly print implementation."""
+        return f"This trie is mapped from a file with {len(self._valid)} nodes"
+    
+    def _table(self, typecode, length):
+        """Returns the next table of the file, without copying it on little-endian machines."""
+        size = array(typecode).itemsize * length
+        table = self._view[self._offset:self._offset + size].cast(typecode)
+        self._offset += size
+        
+        if sys.byteorder == "big":
+            table = array(typecode, table)
+            table.byteswap()
+        
+        self._tables.append(table)
+        return table
+    
+    def close(self):
+        """Releases the tables and unmaps the file. The trie can't be queried afterwards."""
+        for table in self._tables:
+            if isinstance(table, memoryview):
+                table.release()
+        self._view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+    
+    def save(self, path):
+        """Writes the trie to a file, see Trie.save().
+        
+        Note: the mapped file is already in that format, so its bytes are copied as 
+        they are. Saving onto the mapped file itself leaves it untouched, since 
+        truncating it would pull the memory from under the tables.
+        """
+        if os.path.exists(path) and isinstance(self._buffer, mmap.mmap) and os.path.samefile(path, self._path):
+            return
+        with open(path, "wb") as fileobj:
+            fileobj.write(self._buffer)
+    
+    def _insert_from(self, path, word, count):
+        """Every insertion ends up here, and the file is read-only."""
+        raise TypeError(_READ_ONLY)
+    
+    def add(self, word, count = 1):
+        """The file is read-only, see _insert_from()."""
+        raise TypeError(_READ_ONLY)
+    
+    def remove(self, word):
+        """The file is read-only, see _insert_from()."""
+        raise TypeError(_READ_ONLY)
+    
+    def decay(self, factor):
+        """The file is read-only, see _insert_from()."""
+        raise TypeError(_READ_ONLY)
+    
+    def _child(self, node, char):
+        """Returns the id of the child of node for char, False if there is none.
+        
+        Note: the edges of a node are sorted by character code, so this is a binary 
+        search, and a character outside the alphabet has no edge at all.
+        """
+        code = self._codes.get(char)
+        if code is None:
+            return False
+        
+        low = self._first_edge[node]
+        high = self._first_edge[node + 1]
+        
+        i = bisect_left(self._edge_code, code, low, high)
+        if i < high and self._edge_code[i] == code:
+            return self._edge_child[i]
+        return False
+    
+    def _walk(self, prefix):
+        """Returns the id of the node of the last char of the prefix, False if
+        the prefix does not exist in the trie.
+        
+        Note: same steps as _child(), inlined with the tables in local variables 
+        since walks are most of the work of lookups.
+        """
+        codes = self._codes
+        first_edge = self._first_edge
+        edge_code = self._edge_code
+        edge_child = self._edge_child
+        
+        node = self.root
+        for char in prefix:
+            code = codes.get(char)
+            if code is None:
+                return False
+            
+            high = first_edge[node + 1]
+            i = bisect_left(edge_code, code, first_edge[node], high)
+            if i == high or edge_code[i] != code:
+                return False
+            node = edge_child[i]
+        
+        return node
+    
+    def _iter_nodes(self, root, prefix):
+        """Yields (word, node id) for root and every node below it, see Trie._iter_nodes()."""
+        stack = [(root, prefix)]
+        
+        while stack:
+            node, word = stack.pop()
+            yield word, node
+            
+            for edge in reversed(range(self._first_edge[node], self._first_edge[node + 1])):
+                stack.append((self._edge_child[edge], word + self._chars[self._edge_code[edge]]))
+    
+    def _iter_words(self, root, prefix):
+        """Yields (word, occurrence) for every valid word below the node id root in alphabetical order."""
+        stack = [(root, prefix)]
+        
+        while stack:
+            node, word = stack.pop()
+            if self._valid[node]:
+                yield word, self._occurrence[node]
+            
+            # push in reverse so the alphabetically first child is popped next
+            for edge in reversed(range(self._first_edge[node], self._first_edge[node + 1])):
+                stack.append((self._edge_child[edge], word + self._chars[self._edge_code[edge]]))
+    
+    def lookup(self, word):
+        """Determines whether a given word is present in the trie, see Trie.lookup()."""
+        # convert to lower-case, remove white spaces, replace in-word white spaces with hyphens
+        word = word.lower().strip().replace(" ", "-")
+        
+        node = self._walk(word)
+        return node is not False and bool(self._valid[node])
+    
+    def peek_occurrence(self, word):
+        """Determines the occurrence of given word, False if it is not valid."""
+        node = self._walk(word)
+        if node is not False and self._valid[node]:
+            return self._occurrence[node]
+        return False
+    
+    def _node_occurrence(self, node):
+        """Returns the occurrence of the word ending at the node id, False if it is not valid."""
+        if self._valid[node]:
+            return self._occurrence[node]
+        return False
+    
+    def _node_best(self, node):
+        """Returns the highest occurrence in the subtree of the node id.
+        
+        Note: the bounds are not in the file, they are computed on the first call. 
+        Children have higher ids than their parent, so one pass from the last id is enough.
+        """
+        if self._best is None:
+            best = array("I", repeat(0, len(self._valid)))
+            for parent in reversed(range(len(self._valid))):
+                bound = self._occurrence[parent] if self._valid[parent] else 0
+                for edge in range(self._first_edge[parent], self._first_edge[parent + 1]):
+                    bound = max(bound, best[self._edge_child[edge]])
+                best[parent] = bound
+            self._best = best
+        
+        return self._best[node]
+    
+    def word_id(self, word):
+        """Returns the integer id of a word, see Trie.word_id()."""
+        node = self._walk(word)
+        if node is not False and self._valid[node]:
+            return self._node_word[node]
+        return False
+    
+    def word_of(self, word_id):
+        """Returns the word with the given id, see Trie.word_id().
+        
+        Note: the word is spelled from its node up to the root through the parent table.
+        The child ids of a node's edges are increasing like their characters, so the
+        edge into a node is found by a binary search in the edges of its parent, and 
+        the node of the id by one in the nodes of the words, sorted by id.
+        """
+        low, high = 0, len(self._word_node)
+        while low < high:
+            middle = (low + high) // 2
+            if self._node_word[self._word_node[middle]] < word_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self._word_node) or self._node_word[self._word_node[low]] != word_id:
+            return False
+        
+        node = self._word_node[low]
+        chars = []
+        while node != self.root:
+            parent = self._parent[node]
+            edge = bisect_left(self._edge_child, node, self._first_edge[parent], self._first_edge[parent + 1])
+            chars.append(self._chars[self._edge_code[edge]])
+            node = parent
+        
+        return "".join(reversed(chars))
+    
+    def _children(self, node):
+        """Yields (char, child id) for the children of the node id in alphabetical order."""
+        for edge in range(self._first_edge[node], self._first_edge[node + 1]):
+            yield self._chars[self._edge_code[edge]], self._edge_child[edge]
+    
+    def memory_report(self):
+        """Reports the size of the tables, which is all the memory the trie needs."""
+        nodes = len(self._valid)
+        words = sum(self._valid)
+        total_bytes = len(self._view)
+        
+        return {"nodes": nodes,
+                "words": words,
+                "bytes": total_bytes,
+                "bytes_per_node": total_bytes / nodes,
+                "bytes_per_word": total_bytes / words if words else 0}
+
+
+class PhraseTrie:
+    """This class completes phrases, i.e. sequences of words, ranked by frequency.
+    
+    It is a trie over words instead of characters: each Node holds a whole word
+    in self.char and its occurrence counts the phrase spelled by the path from
+    the root. Every phrase of 1 to n consecutive words of the text is counted, so 
+    the phrases of n words are the longest completions.
+    
+    Parameters
+    ----------
+    self.n --> int
+        the maximum number of words of a phrase
+    self.root --> Node
+        the root node with an empty string
+    self.nodes --> int
+        the number of nodes below the root, i.e. of distinct phrases
+    self.max_nodes --> int / None
+        if set, the rarest phrases are pruned whenever there are more nodes
+    self.min_count --> int
+        phrases counted fewer times are pruned once text is counted, and by max_nodes
+    
+    Methods
+    -------
+    add_text(self, text)
+        Counts the phrases of a piece of text.
+    add_tokens(self, tokens)
+        Counts the phrases of a list of words.
+    prune(self, min_count)
+        Removes the phrases counted fewer than min_count times.
+    count(self, phrase)
+        Determines how often a phrase was counted.
+    next_words(self, phrase, k)
+        Finds the k most common words following a phrase.
+    complete(self, phrase, k)
+        Finds the k most common longest phrases starting with a (partial) phrase.
+    """
+    
+    def __init__(self, text = None, n = 4, min_count = 1, max_nodes = None, tokenizer = tokenize):
+        """Creates the PhraseTrie instance, counts the phrases of text if provided.
+        
+        Parameters
+        ----------
+        text : str
+            A piece of raw text, e.g. a corpus, see add_text().
+        n : int
+            Maximum number of words of a phrase.
+        min_count : int
+            Phrases counted fewer times are removed once text is counted. 
+        max_nodes : int
+            Upper bound on the number of nodes: when it is exceeded while counting,
+            the rarest phrases are pruned until a quarter of the nodes is free, see
+            _shrink(). Counts are then approximate, since a pruned phrase starts 
+            from zero if it comes back, and the phrases are only recalled if they 
+            are counted as often as the survivors of a prune within the text that 
+            fills a quarter of the trie.
+        tokenizer : function
+            Turns a piece of text into a list of words, tokenize() by default.
+        """
+        self.n = n
+        self.root = Node("")
+        self.nodes = 0
+        self.min_count = min_count
+        self.max_nodes = max_nodes
+        self.tokenizer = tokenizer
+        
+        if text is not None:
+            self.add_text(text)
+            self.prune(self.min_count)
+    
+    def __repr__(self):
+        """Overrides the defauly print implementation."""
+        return f"This phrase trie has {self.nodes:,} phrases of up to {self.n} words"
+    
+    def add_text(self, text):
+        """Counts the phrases of a piece of text, see add_tokens()."""
+        self.add_tokens([word.lower() for word in self.tokenizer(text)])
+    
+    def add_tokens(self, tokens):
+        """Counts every phrase of 1 to n consecutive words.
+        
+        Parameters
+        ----------
+        tokens : list of str
+            The words in the order of the text, already normalized.
+        """
+        for i in range(len(tokens)):
+            node = self.root
+            
+            for word in tokens[i:i + self.n]:
+                child = node.children.get(word)
+                if child is None:
+                    child = node.add_child(word)
+                    self.nodes += 1
+                child.occurrence += 1
+                node = child
+            
+            if self.max_nodes is not None and self.nodes > self.max_nodes:
+                self._shrink()
+    
+    def prune(self, min_count):
+        """Removes the phrases counted fewer than min_count times.
+        
+        A longer phrase is never counted more often than the phrase it extends, 
+        so the whole subtree of a rare phrase goes with it.
+        
+        Returns
+        ----------
+        int
+            The number of nodes removed.
+        """
+        removed = 0
+        stack = [self.root]
+        
+        while stack:
+            node = stack.pop()
+            for word, child in list(node.children.items()):
+                if child.occurrence < min_count:
+                    removed += sum(1 for _ in _subtree(child))
+                    del node.children[word]
+                    node._sorted_children = None
+                else:
+                    stack.append(child)
+        
+        self.nodes -= removed
+        return removed
+    
+    # new inner method
+    def _shrink(self):
+        """Prunes the rarest phrases until at most 3/4 of max_nodes are left.
+        
+        Note: a phrase is never counted more often than the phrase it extends, so 
+        pruning below a threshold keeps exactly the nodes counted at least that 
+        often, and the threshold is picked from the counts at once. It only holds 
+        for this prune, new phrases are again kept from min_count on, otherwise the 
+        threshold would only ever rise until hardly any new phrase survives. As a 
+        token adds at most n nodes, freeing a quarter of them spaces out the prunes,
+        which visit every node, to O(n) work per token on average.
+        """
+        target = self.max_nodes * 3 // 4
+        counts = Counter(node.occurrence for _, node in _subtree(self.root) if node is not self.root)
+        
+        # from the most common down, the lowest count whose nodes all fit
+        kept = 0
+        threshold = None
+        for occurrence in sorted(counts, reverse = True):
+            if kept + counts[occurrence] > target:
+                break
+            kept += counts[occurrence]
+            threshold = occurrence
+        
+        if threshold is None:
+            threshold = max(counts) + 1 # even the most common phrases don't fit
+        self.prune(max(threshold, self.min_count))
+    
+    def count(self, phrase):
+        """Determines how often a phrase was counted, False if it never was."""
+        node = self._walk(self._tokens(phrase))
+        if node is False or node is self.root:
+            return False
+        return node.occurrence
+    
+    def next_words(self, phrase, k = 5):
+        """Finds the k most common words following a phrase.
+        
+        Parameters
+        ----------
+        phrase : str
+            The words typed so far. Only its last n - 1 words are looked at.
+        k : int
+            Number of words to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (word, count) tuples, most common first, or an error message.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        tokens = self._tokens(phrase)
+        node = self._walk(tokens[max(0, len(tokens) - self.n + 1):] if self.n > 1 else [])
+        if node is False:
+            return "ERROR: phrase does not exist in trie"
+        
+        return heapq.nsmallest(k, ((child.char, child.occurrence) for child in node.children.values()), key=_rank_key)
+    
+    def complete(self, phrase, k = 5):
+        """Finds the k most common longest phrases starting with a partial phrase.
+        
+        Parameters
+        ----------
+        phrase : str
+            The words typed so far. Unless it ends with a white space, its last
+            word may be incomplete, e.g. "to b" completes like "to be".
+        k : int
+            Number of phrases to be returned.
+            
+        Returns
+        ----------
+        list
+            List of (phrase, count) tuples, most common first, or an error message.
+            Each phrase is the input followed by the words that complete it, up to 
+            the longest phrases counted, e.g. "to be" -> "to be or not" for n = 4.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+        
+        tokens = self._tokens(phrase)
+        partial = "" if not tokens or phrase[-1:].isspace() else tokens.pop()
+        
+        # only the last words fit in a phrase of n words along with a completion
+        context = tokens[max(0, len(tokens) - self.n + 1):]
+        node = self._walk(context)
+        if node is False:
+            return "ERROR: phrase does not exist in trie"
+        
+        # best-first search for the longest phrases, i.e. leaves, possibly pruned ones:
+        # no phrase is counted more often than the phrase it extends, so once a leaf
+        # is popped nothing left in the heap can complete more often than it
+        heap = [(-child.occurrence, " ".join(tokens + [child.char]), id(child), child) 
+                for child in node.children.values() if child.char.startswith(partial)]
+        if not heap:
+            return "ERROR: phrase does not exist in trie"
+        
+        heapq.heapify(heap)
+        completions = []
+        
+        while heap and len(completions) < k:
+            negative_count, words, _, node = heapq.heappop(heap)
+            if not node.children:
+                completions.append((words, -negative_count))
+            for child in node.children.values():
+                heapq.heappush(heap, (-child.occurrence, words + " " + child.char, id(child), child))
+        
+        return completions
+    
+    # inner method
+    def _tokens(self, phrase):
+        """Splits a phrase into normalized words."""
+        return [word.lower() for word in self.tokenizer(phrase)]
+    
+    # inner method
+    def _walk(self, tokens):
+        """Returns the node of the phrase of tokens, False if it was never counted."""
+        node = self.root
+        for word in tokens:
+            node = node.children.get(word)
+            if node is None:
+                return False
+        return node
+
+
+def _subtree(root, words = ()):
+    """Yields (words, node) for root and every node below it, words being the 
+    labels on the path from root's parent down to the node."""
+    stack = [(root, words)]
+    while stack:
+        node, words = stack.pop()
+        yield words, node
+        stack.extend((child, words + (child.char,)) for child in node.children.values())
+
+
+class ConcurrentTrie:
+    """This class shares a trie between reader threads and writer threads.
+    
+    Readers never block: every query runs on the current snapshot, a Trie that is
+    never modified once published. Writers are serialized by a lock; each write 
+    copies the nodes on the path of the inserted words (copy-on-write), inserts 
+    into the copies and then publishes the new snapshot with a single assignment.
+    Nodes off the path are shared between snapshots.
+    
+    Parameters
+    ----------
+    self._snapshot --> Trie
+        the published trie, replaced as a whole by each write
+    self._write_lock --> threading.Lock
+        serializes the writers, readers never take it
+    
+    Methods
+    -------
+    snapshot(self)
+        Returns the current snapshot, e.g. to run several queries on the same version.
+    insert(self, word, count)
+        Inserts a word, see Trie.insert().
+    insert_many(self, words)
+        Inserts many words as a single write, see Trie.bulk_load().
+    merge(self, other)
+        Adds the words of another trie as a single write, see Trie.merge().
+    add(self, word, count), remove(self, word), decay(self, factor)
+        Same as for a Trie, each as a single write.
+    
+    Every other attribute, e.g. autocomplete() or top_k_completions(), is looked-up
+    on the current snapshot.
+    """
+    
+    def __init__(self, word_list = None, cache_k = None):
+        """Creates the ConcurrentTrie instance, see Trie.__init__()."""
+        self._snapshot = Trie(word_list, cache_k = cache_k)
+        self._write_lock = threading.Lock()
+    
+    def __repr__(self):
+        """Overrides the defauly print implementation."""
+        return f"This concurrent trie has snapshot: \n{self._snapshot}"
+    
+    def __getattr__(self, name):
+        """Looks-up queries on the current snapshot, so a query never sees a write halfway."""
+        if name in ("create_trie", "bulk_load", "_bulk_insert", "_insert_from", "enable_result_cache", "enable_instrumentation", "enable_infix_index"):
+            raise AttributeError(f"'{name}' would modify a published snapshot, use insert_many() instead")
+        return getattr(self._snapshot, name)
+    
+    def snapshot(self):
+        """Returns the current snapshot. It must not be modified by the caller."""
+        return self._snapshot
+    
+    def insert(self, word, count = 1):
+        """Inserts a word into the trie, see Trie.insert()."""
+        self._write([(word, count)])
+    
+    def insert_many(self, words):
+        """Inserts many words as a single write, i.e. readers see all of them or none.
+        
+        Parameters
+        ----------
+        words : list / Mapping
+            Strings to be inserted, converted into lower-case, or a Mapping 
+            such as a Counter from strings to their occurrences.
+        """
+        counts = Counter()
+        if isinstance(words, Mapping):
+            for word, count in words.items():
+                counts[word.lower()] += count
+        else:
+            counts.update(word.lower() for word in words)
+        
+        # sorted, so consecutive words share most of their copied path
+        self._write(sorted(counts.items()))
+    
+    def merge(self, other):
+        """Adds the words of another trie or Mapping as a single write, see Trie.merge()."""
+        if isinstance(other, Mapping):
+            self.insert_many(other)
+        else:
+            self._write(list(other._iter_words(other.root, "")))
+    
+    def add(self, word, count = 1):
+        """Adds a possibly negative count to the occurrence of a word, see Trie.add()."""
+        with self._write_lock:
+            trie = self._copy_snapshot([word])
+            if count <= 0:
+                trie._words = dict(trie._words) # the word may be removed, see remove()
+            trie.add(word, count)
+            self._snapshot = trie
+    
+    def remove(self, word):
+        """Removes a word from the trie, see Trie.remove()."""
+        with self._write_lock:
+            trie = self._copy_snapshot([word])
+            
+            # the published snapshots keep the id of the word, so the table is copied too
+            trie._words = dict(trie._words)
+            occurrence = trie.remove(word)
+            self._snapshot = trie
+        return occurrence
+    
+    def decay(self, factor):
+        """Ages every occurrence at once, see Trie.decay().
+        
+        Note: every node changes, so the new snapshot is built from the aged counts
+        instead of copying the nodes one path at a time, then given back the word ids.
+        """
+        if not 0 <= factor <= 1:
+            return "ERROR: factor must be between 0 and 1"
+        
+        with self._write_lock:
+            snapshot = self._snapshot
+            counts = [(word, int(node.occurrence * factor), node.word_id) 
+                      for word, node in snapshot._iter_nodes(snapshot.root, "") if node.valid]
+            kept = [(word, count, word_id) for word, count, word_id in counts if count > 0]
+            
+            trie = Trie(cache_k = snapshot.cache_k)
+            trie._bulk_insert((word, count) for word, count, _ in kept)
+            trie._words = {}
+            trie._next_id = snapshot._next_id
+            for word, _, word_id in kept:
+                trie._walk(word).word_id = word_id
+                trie._words[word_id] = word
+            self._snapshot = trie
+        
+        return len(counts) - len(kept)
+    
+    # new inner method
+    def _write(self, counts):
+        """Inner function to the inserting methods. Inserts sorted (word, count) pairs 
+        into a copy of the snapshot and publishes it."""
+        with self._write_lock:
+            trie = self._copy_snapshot(word for word, _ in counts)
+            trie._bulk_insert(counts)
+            
+            # publishing is a single assignment, which readers see entirely or not at all
+            self._snapshot = trie
+    
+    # new inner method
+    def _copy_snapshot(self, words):
+        """Returns a copy of the snapshot whose nodes on the paths of words are copies too,
+        so the words can be inserted or removed without touching the published nodes.
+        
+        Note: nodes created later on, e.g. by an insertion, belong to the copy anyway.
+        """
+        trie = copy.copy(self._snapshot)
+        trie.root = self._copy_node(trie.root, None)
+        trie._cursors = None # the cursors of the snapshot continue its own traversals
+        
+        # ids of the nodes created by this write, which can be modified in place
+        fresh = {id(trie.root)}
+        for word in words:
+            self._copy_path(trie.root, word, fresh)
+        
+        return trie
+    
+    # new inner method
+    def _copy_path(self, root, word, fresh):
+        """Replaces the published nodes on the path of word by copies, returns the path."""
+        path = [root]
+        node = root
+        
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                break
+            if id(child) not in fresh:
+                child = self._copy_node(child, node)
+                node.children[char] = child
+                node._sorted_children = None
+                fresh.add(id(child))
+            path.append(child)
+            node = child
+        
+        return path
+    
+    # new inner method
+    def _copy_node(self, node, parent):
+        """Returns a copy of the node, sharing its children with the original."""
+        new_node = Node(node.char)
+        new_node.valid = node.valid
+        new_node.parent = parent
+        new_node.children = dict(node.children)
+        new_node.occurrence = node.occurrence
+        new_node.word_id = node.word_id
+        new_node.best = node.best
+        if node.top_k is not None:
+            new_node.top_k = list(node.top_k)
+        return new_node
+
+
+class LazyTrie:
+    """This class stands for a trie file written by Trie.save(), loaded on its first query.
+    
+    Creating it costs nothing, so a module can hold a few prebuilt tries and only
+    pay for the ones it queries. Every attribute, e.g. autocomplete(), is looked-up
+    on the loaded trie.
+    
+    Parameters
+    ----------
+    self.path --> str / path
+        the trie file
+    self.mmap --> bool
+        passed on to Trie.load(), True for a read-only memory-mapped trie
+    """
+    
+    def __init__(self, path, mmap = True):
+        """Creates the LazyTrie instance, the file is not opened yet."""
+        self.path = path
+        self.mmap = mmap
+        self._trie = None
+        self._load_lock = threading.Lock()
+    
+    def __repr__(self):
+        """Overrides the defauly print implementation."""
+        state = "loaded" if self._trie is not None else "not loaded yet"
+        return f"This lazy trie is {state} from {self.path}"
+    
+    def __getattr__(self, name):
+        """Looks-up everything else on the trie, loading it first."""
+        return getattr(self.load(), name)
+    
+    def load(self):
+        """Returns the trie, loading it on the first call only, even from several threads."""
+        if self._trie is None:
+            with self._load_lock:
+                if self._trie is None:
+                    self._trie = Trie.load(self.path, mmap = self.mmap)
+        return self._trie
+
+
+def prebuilt(name, directory = None, mmap = True):
+    """Returns a prebuilt trie, loaded on its first query.
+    
+    Parameters
+    ----------
+    name : str
+        The name of the trie file without its extension, e.g. "shakespeare" 
+        for shakespeare.trie.
+    directory : str / path
+        Where the trie files are, PREBUILT_DIR by default: the AUTOCOMPLETE_TRIES
+        environment variable, or else the tries directory next to this file.
+    mmap : bool
+        True (default) for a read-only memory-mapped trie, False for a Trie.
+        
+    Returns
+    ----------
+    LazyTrie
+        The trie, which reads the file when it is first queried.
+        
+    Note: the files are built offline from text files by the command line, e.g.
+    
+        python autocomplete.py shakespeare.txt -o tries/shakespeare.trie
+    """
+    path = os.path.join(directory if directory is not None else PREBUILT_DIR, name + ".trie")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} does not exist, build it with: python autocomplete.py <text files> -o {path}")
+    return LazyTrie(path, mmap)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description = "Builds a trie file from local text files, to be loaded by prebuilt().")
+    parser.add_argument("sources", nargs = "+", help = "UTF-8 text files, their words are converted into lower-case")
+    parser.add_argument("-o", "--output", required = True, help = "the trie file to write, e.g. tries/shakespeare.trie")
+    parser.add_argument("--radix", action = "store_true", help = "build a RadixTrie, which needs less memory while building and writes the same file")
+    parser.add_argument("--progress", action = "store_true", help = "print the number of tokens ingested")
+    args = parser.parse_args()
+    
+    trie = RadixTrie() if args.radix else Trie()
+    for source in args.sources:
+        with open(source, encoding = "utf-8") as fileobj:
+            trie._ingest(fileobj, tokenize, 1 << 20, args.progress)
+    
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+    trie.save(args.output)
+    print(f"NOTE: {args.output} holds {trie.memory_report()['words']:,} words, {os.path.getsize(args.output):,} bytes")
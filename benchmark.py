@@ -0,0 +1,746 @@
+"""Benchmarks for the trie autocomplete engine.
+
+Runs offline on a synthetic, Shakespeare-sized word list so the numbers are
+reproducible. Usage:
+
+    python benchmark.py
+
+The regression suite builds Zipf-distributed corpora of 10^4 to 10^7 tokens,
+writes its measurements as JSON and, given the JSON of an earlier run, prints
+how much each of them changed:
+
+    python benchmark.py --suite --output new.json --compare old.json
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import autocomplete
+from autocomplete import PhraseTrie, RadixTrie, Trie, tokenize
+from service import Client, ShardedService
+
+
+# roughly the size of the Shakespeare word bank used in test.py
+SHAKESPEARE_TOKENS = 900000
+SHAKESPEARE_VOCABULARY = 28000
+
+# lower-case letters, weighted like English text, plus a few accented ones
+ALPHABET = "eeeeeeeeeeeetttttttttaaaaaaaaooooooooiiiiiiinnnnnnnsssssshhhhhhrrrrrrddddllllcccuuummwwffggyyppbbvkjxqzéëáóú"
+
+
+def synthetic_words(n_tokens = SHAKESPEARE_TOKENS, n_unique = SHAKESPEARE_VOCABULARY, seed = 110):
+    """Generates a Zipf-distributed list of words.
+
+    Parameters
+    ----------
+    n_tokens : int
+        Number of words in the returned list, repetitions included.
+    n_unique : int
+        Number of distinct words to draw from.
+    seed : int
+        Seed of the random generator, so every run gets the same list.
+
+    Returns
+    ----------
+    list
+        List of strings, the i-th most common word appearing about 1/i as often as the first.
+    """
+    rng = random.Random(seed)
+
+    vocabulary = set()
+    while len(vocabulary) < n_unique:
+        length = min(1 + int(rng.expovariate(1 / 6)), 20)
+        vocabulary.add("".join(rng.choice(ALPHABET) for _ in range(length)))
+
+    # shuffle so the frequency rank has nothing to do with the alphabetical order
+    vocabulary = sorted(vocabulary)
+    rng.shuffle(vocabulary)
+    weights = [1 / rank for rank in range(1, n_unique + 1)]
+
+    return rng.choices(vocabulary, weights, k = n_tokens)
+
+
+def percentiles(latencies):
+    """Returns the p50 and p99 of a list of latencies, in milliseconds."""
+    latencies = sorted(latencies)
+    return (1000 * latencies[len(latencies) // 2],
+            1000 * latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)])
+
+
+def timed(function, *args, repeat = 3):
+    """Returns the best wall time in seconds over a few calls of function(*args)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_insert_lookup(words):
+    """Measures insert and lookup throughput in words per second.
+
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, every word is looked-up once.
+    """
+    insert_time = timed(Trie, words)
+
+    trie = Trie(words)
+    def lookup_all():
+        for word in words:
+            trie.lookup(word)
+    lookup_time = timed(lookup_all)
+
+    print(f"insert: {len(words) / insert_time:12,.0f} words/sec")
+    print(f"lookup: {len(words) / lookup_time:12,.0f} words/sec")
+
+
+def bench_build(words):
+    """Measures how long building a trie takes from each kind of input.
+
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from.
+    """
+    counts = Counter(word.lower() for word in words)
+    sorted_words = sorted(word.lower() for word in words)
+
+    def from_sorted():
+        Trie().bulk_load(sorted_words)
+
+    print(f"build from list:    {timed(Trie, words):8.3f} sec")
+    print(f"build from Counter: {timed(Trie, counts):8.3f} sec")
+    print(f"build from sorted:  {timed(from_sorted):8.3f} sec")
+
+
+def bench_startup(words):
+    """Compares building a trie from the word list with loading a saved one.
+
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from.
+    """
+    trie = Trie(words)
+    prefixes = sorted({word[:2] for word in words})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.trie")
+        trie.save(path)
+
+        def first_query(load):
+            load().autocomplete(prefixes[0])
+
+        print(f"startup, build from list: {timed(first_query, lambda: Trie(words)):8.3f} sec")
+        print(f"startup, load into Nodes: {timed(first_query, lambda: Trie.load(path, mmap = False)):8.3f} sec")
+        print(f"startup, memory-map:      {timed(first_query, lambda: Trie.load(path)):8.3f} sec")
+
+        mapped = Trie.load(path)
+        def autocomplete_all(trie):
+            for prefix in prefixes:
+                trie.autocomplete(prefix)
+        print(f"autocomplete, Nodes:      {len(prefixes) / timed(autocomplete_all, trie):12,.0f} prefixes/sec")
+        print(f"autocomplete, mapped:     {len(prefixes) / timed(autocomplete_all, mapped):12,.0f} prefixes/sec")
+        mapped.close()
+
+
+def bench_cold_start(words, repeat = 3):
+    """Measures a fresh interpreter from start to its first autocomplete(), for each way of getting a trie.
+    
+    Parameters
+    ----------
+    words : list
+        The words of the text file the trie is built from.
+    repeat : int
+        Number of interpreters started for each measurement, the fastest one counts.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = os.path.join(directory, "corpus.txt")
+        with open(corpus, "w", encoding = "utf-8") as fileobj:
+            fileobj.write(" ".join(words))
+        
+        start = time.perf_counter()
+        subprocess.run([sys.executable, autocomplete.__file__, corpus, "-o", os.path.join(directory, "corpus.trie")], 
+                       check = True, capture_output = True)
+        print(f"cold start, build the file:    {time.perf_counter() - start:8.3f} sec (offline, once)")
+        
+        scripts = [("interpreter only", "pass"),
+                   ("import autocomplete", "import autocomplete"),
+                   ("build from the text", f"from autocomplete import Trie; Trie.from_stream({corpus!r}).autocomplete('th')"),
+                   ("prebuilt, memory-map", f"from autocomplete import prebuilt; prebuilt('corpus', {directory!r}).autocomplete('th')"),
+                   ("prebuilt, into Nodes", f"from autocomplete import prebuilt; prebuilt('corpus', {directory!r}, mmap = False).autocomplete('th')")]
+        
+        # run next to autocomplete.py, wherever the benchmark is started from
+        def run(script):
+            subprocess.run([sys.executable, "-c", script], cwd = os.path.dirname(autocomplete.__file__), check = True)
+        
+        for name, script in scripts:
+            seconds = timed(run, script, repeat = repeat)
+            print(f"cold start, {name + ':':21} {seconds:8.3f} sec")
+
+
+def bench_batches(words, batch_size = 500):
+    """Compares the batched query methods with a loop over the single-item ones.
+
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, queries are drawn from it.
+    batch_size : int
+        Number of queries per batch.
+    """
+    trie = Trie(words)
+    rng = random.Random(110)
+    batch = rng.sample(words, batch_size)
+    prefixes = [word[:rng.randint(1, 3)] for word in batch]
+
+    loop = timed(lambda: [trie.lookup(word) for word in batch])
+    print(f"lookup, loop:       {batch_size / loop:12,.0f} words/sec")
+    print(f"lookup_many:        {batch_size / timed(trie.lookup_many, batch):12,.0f} words/sec")
+
+    loop = timed(lambda: [trie.autocomplete(prefix) for prefix in prefixes])
+    print(f"autocomplete, loop: {batch_size / loop:12,.0f} prefixes/sec")
+    print(f"autocomplete_many:  {batch_size / timed(trie.autocomplete_many, prefixes):12,.0f} prefixes/sec")
+
+
+def bench_backends(words):
+    """Compares the size and query speed of the Trie and RadixTrie backends.
+
+    Parameters
+    ----------
+    words : list
+        The word list the tries are built from.
+    """
+    prefixes = sorted({word[:3] for word in words})
+
+    for backend in [Trie, RadixTrie]:
+        trie = backend(words)
+        report = trie.memory_report()
+
+        def autocomplete_all():
+            for prefix in prefixes:
+                trie.autocomplete(prefix)
+
+        print(f"{backend.__name__:9} {report['nodes']:9,} nodes {report['bytes_per_word']:8,.0f} bytes/word "
+              f"{len(prefixes) / timed(autocomplete_all):10,.0f} autocompletes/sec")
+
+
+def bench_fuzzy(words, n_queries = 200):
+    """Measures fuzzy_autocomplete() latency on prefixes with one typo.
+
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, prefixes are drawn from it.
+    n_queries : int
+        Number of prefixes to complete.
+    """
+    rng = random.Random(110)
+    prefixes = []
+    for word in rng.sample(sorted(set(words)), n_queries):
+        prefix = word[:rng.randint(2, max(2, len(word)))]
+        i = rng.randrange(len(prefix))
+        prefixes.append(prefix[:i] + rng.choice(ALPHABET) + prefix[i + 1:])
+
+    for cache_k in [None, 10]:
+        trie = Trie(words, cache_k = cache_k)
+        for max_edits in [1, 2]:
+            latencies = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                trie.fuzzy_autocomplete(prefix, max_edits, 10)
+                latencies.append(time.perf_counter() - start)
+
+            p50, p99 = percentiles(latencies)
+            print(f"fuzzy, cache_k={cache_k}, max_edits={max_edits}: p50 {p50:8.2f} ms  p99 {p99:8.2f} ms")
+
+
+def bench_parallel(words, copies = 8):
+    """Measures how build_parallel() scales with the number of worker processes.
+    
+    Parameters
+    ----------
+    words : list
+        The word list, joined into a text and replicated into one chunk per copy.
+    copies : int
+        Number of copies of the text, i.e. of chunks to count.
+    """
+    chunks = [" ".join(words)] * copies
+    print(f"{os.cpu_count()} CPUs, {copies} chunks of {len(words):,} words")
+    
+    for workers in [1, 2, 4, 8]:
+        seconds = timed(Trie.build_parallel, chunks, workers, repeat = 1)
+        print(f"build_parallel, {workers} workers: {seconds:8.3f} sec {copies * len(words) / seconds:12,.0f} words/sec")
+
+
+def bench_service(words, concurrency = 32, n_requests = 5000):
+    """Load-tests the sharded service on localhost, reporting latency and QPS.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the shards are built from, prefixes are drawn from it.
+    concurrency : int
+        Number of client connections sending requests at the same time.
+    n_requests : int
+        Number of requests, one in a hundred is a k_most_common(10).
+    """
+    rng = random.Random(110)
+    requests = [("autocomplete", word[:rng.randint(1, 3)]) for word in rng.sample(words, n_requests)]
+    for i in range(0, n_requests, 100):
+        requests[i] = ("k_most_common", 10)
+    
+    async def load(port):
+        clients = [await Client.connect("127.0.0.1", port) for _ in range(concurrency)]
+        latencies = []
+        
+        async def send(client, requests):
+            for request in requests:
+                start = time.perf_counter()
+                await client.request(*request)
+                latencies.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(send(client, requests[i::concurrency]) for i, client in enumerate(clients)))
+        seconds = time.perf_counter() - start
+        
+        for client in clients:
+            await client.close()
+        return latencies, seconds
+    
+    for n_shards in [1, 2, 4]:
+        service = ShardedService(words, n_shards, cache_k = 10)
+        
+        async def main():
+            await service.connect()
+            server = await service.serve()
+            try:
+                return await load(server.sockets[0].getsockname()[1])
+            finally:
+                server.close()
+                await service.close()
+        
+        latencies, seconds = asyncio.run(main())
+        p50, p99 = percentiles(latencies)
+        print(f"service, {n_shards} shards: p50 {p50:8.2f} ms  p99 {p99:8.2f} ms {n_requests / seconds:10,.0f} QPS")
+
+
+def bench_result_cache(words, n_queries = 20000, insert_every = 50):
+    """Compares skewed query traffic with and without the result cache.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from. Queries are prefixes of its words,
+        so they are as skewed as the words themselves.
+    n_queries : int
+        Number of queries, one in 1000 is a k_most_common(10), the others autocomplete().
+    insert_every : int
+        A word is inserted after every insert_every queries, which invalidates 
+        the results of its prefixes.
+    """
+    rng = random.Random(110)
+    prefixes = [word[:rng.randint(1, 3)] for word in rng.choices(words, k = n_queries)]
+    
+    def run(trie):
+        for i, prefix in enumerate(prefixes):
+            if i % 1000 == 0:
+                trie.k_most_common(10)
+            else:
+                trie.autocomplete(prefix)
+            if i % insert_every == 0:
+                trie.insert(words[i])
+    
+    for cache_k in [None, 10]:
+        trie = Trie(words, cache_k = cache_k)
+        seconds = timed(run, trie, repeat = 1)
+        print(f"no result cache, cache_k={cache_k}: {n_queries / seconds:10,.0f} queries/sec")
+        
+        trie = Trie(words, cache_k = cache_k)
+        cache = trie.enable_result_cache()
+        seconds = timed(run, trie, repeat = 1)
+        print(f"result cache,    cache_k={cache_k}: {n_queries / seconds:10,.0f} queries/sec {cache.stats()}")
+
+
+def bench_instrumentation(words):
+    """Compares autocomplete() throughput before, with and after the instrumentation.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, prefixes are drawn from it.
+    """
+    trie = Trie(words)
+    prefixes = sorted({word[:3] for word in words})
+    
+    def autocomplete_all():
+        for prefix in prefixes:
+            trie.autocomplete(prefix)
+    
+    print(f"autocomplete, plain:        {len(prefixes) / timed(autocomplete_all):10,.0f} prefixes/sec")
+    instrumentation = trie.enable_instrumentation()
+    print(f"autocomplete, instrumented: {len(prefixes) / timed(autocomplete_all):10,.0f} prefixes/sec")
+    trie.disable_instrumentation()
+    print(f"autocomplete, disabled:     {len(prefixes) / timed(autocomplete_all):10,.0f} prefixes/sec")
+    
+    stats = instrumentation.snapshot()["autocomplete"]
+    print(f"per autocomplete: {stats['totals']['nodes_visited'] / stats['calls']:8.1f} nodes visited, "
+          f"{stats['totals']['words_materialized'] / stats['calls']:8.1f} words materialized")
+
+
+def bench_phrases(words, n = 4, n_queries = 500):
+    """Measures the size and speed of PhraseTrie for a few count thresholds.
+    
+    Parameters
+    ----------
+    words : list
+        The words of the text, in order.
+    n : int
+        Maximum number of words of a phrase.
+    n_queries : int
+        Number of partial phrases to complete, drawn from the text.
+    """
+    rng = random.Random(110)
+    queries = []
+    for _ in range(n_queries):
+        i = rng.randrange(len(words) - 2)
+        phrase = " ".join(words[i:i + rng.randint(1, 2)])
+        queries.append(phrase[:len(phrase) - rng.randint(0, 2)])
+    
+    for min_count, max_nodes in [(1, None), (3, None), (1, 10 ** 6)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        phrases = PhraseTrie(n = n, min_count = min_count, max_nodes = max_nodes)
+        phrases.add_tokens(words)
+        phrases.prune(phrases.min_count)
+        seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        latencies = []
+        for phrase in queries:
+            start = time.perf_counter()
+            phrases.complete(phrase, 5)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = percentiles(latencies)
+        
+        print(f"phrases, min_count={min_count}, max_nodes={max_nodes}: {phrases.nodes:10,} nodes "
+              f"{peak_bytes / 2 ** 20:8.1f} MiB peak, built in {seconds:6.2f} sec (traced), "
+              f"complete p50 {p50:6.2f} ms p99 {p99:6.2f} ms")
+
+
+def bench_word_ids(words):
+    """Measures the lookup-heavy calls, and converting words to and from their ids,
+    on Nodes and on a memory-mapped file.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, every distinct word is queried once.
+    """
+    trie = Trie(words)
+    vocabulary = sorted(set(words))
+    ids = [trie.word_id(word) for word in vocabulary]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.trie")
+        trie.save(path)
+        mapped = Trie.load(path)
+        
+        for name, backend in [("Nodes", trie), ("mapped", mapped)]:
+            for method, queries in [(backend.lookup, vocabulary), (backend.word_id, vocabulary), (backend.word_of, ids)]:
+                def query_all():
+                    for query in queries:
+                        method(query)
+                print(f"{method.__name__ + ', ' + name + ':':18} {len(queries) / timed(query_all):12,.0f} calls/sec")
+        
+        print(f"file: {os.path.getsize(path) / len(vocabulary):8.1f} bytes/word, {len(mapped._chars)} characters in the alphabet")
+        mapped.close()
+
+
+def bench_infix(words, n_queries = 500):
+    """Compares infix_search() with and without its index: build time, memory and latency.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, fragments are drawn from inside its words.
+    n_queries : int
+        Number of fragments to search.
+    """
+    trie = Trie(words)
+    rng = random.Random(110)
+    fragments = []
+    for word in rng.sample(words, n_queries):
+        start = rng.randrange(len(word))
+        fragments.append(word[start:start + rng.randint(2, 6)])
+    
+    # a first traversal caches the sorted children, which belong to the trie and not the index
+    trie.alphabetical_list()
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = trie.enable_infix_index()
+    seconds = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"infix index: {len(index):,} n-grams, {index_bytes / 2 ** 20:6.1f} MiB, built in {seconds:6.3f} sec (traced)")
+    
+    for name in ["linear scan", "index"]:
+        if name == "linear scan":
+            trie.infix_index = None
+        else:
+            trie.infix_index = index
+        
+        latencies = []
+        for fragment in fragments:
+            start = time.perf_counter()
+            trie.infix_search(fragment, 10)
+            latencies.append(time.perf_counter() - start)
+        
+        p50, p99 = percentiles(latencies)
+        print(f"infix_search, {name + ':':12} p50 {p50:8.3f} ms  p99 {p99:8.3f} ms")
+
+
+def bench_completions(words, page_size = 10, n_pages = 10):
+    """Compares paging through completions() with materializing every completion.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, the one-letter prefixes are the queries.
+    page_size : int
+        Number of words per page.
+    n_pages : int
+        Number of pages read for each prefix.
+    """
+    trie = Trie(words)
+    prefixes = sorted({word[0] for word in words})
+    
+    def page_through(order, keep_cursors):
+        for prefix in prefixes:
+            page, token = trie.completions(prefix, order, page_size)
+            for _ in range(n_pages - 1):
+                if token is None:
+                    break
+                if not keep_cursors:
+                    trie._cursors.clear()
+                page, token = trie.completions(page_size = page_size, token = token)
+    
+    def materialize(order):
+        for prefix in prefixes:
+            if order == "alpha":
+                list(trie.iter_words(prefix))
+            else:
+                trie.top_k_completions(prefix, len(words))
+    
+    for order in ["alpha", "freq"]:
+        for name, function in [("cursor", lambda: page_through(order, True)),
+                               ("token only", lambda: page_through(order, False)),
+                               ("all words", lambda: materialize(order))]:
+            # timed first, so the traced run doesn't count the sorted children cached by the trie
+            seconds = timed(function)
+            trie._cursors.clear()
+            
+            tracemalloc.start()
+            function()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+            print(f"completions, {order}, {name + ':':11} {1000 * seconds / len(prefixes):8.2f} ms "
+                  f"per {n_pages} pages, {peak_bytes / 2 ** 10:8.0f} KiB peak")
+
+
+def bench_scorers(words, k = 10):
+    """Compares the best-first top k search with enumerating every word with the prefix.
+    
+    Parameters
+    ----------
+    words : list
+        The word list the trie is built from, the one- and two-letter prefixes are the queries.
+    k : int
+        Number of completions per prefix.
+    """
+    trie = Trie(words)
+    counts = Counter(words)
+    prefixes = sorted({word[:length] for word in words for length in (1, 2)})
+    
+    # the longer words of every tenth type get a boost, a few were used in the last days
+    vocabulary = sorted(counts)
+    boosts = {word: 2.0 for word in vocabulary[::10] if len(word) > 6}
+    last_used = {word: time.time() - 3600 * i for i, word in enumerate(vocabulary[::50])}
+    scorers = [("occurrence", autocomplete.Scorer()),
+               ("weighted", autocomplete.WeightedScorer(length = 0.1, boosts = boosts, recency = 3.0, last_used = last_used))]
+    
+    for name, scorer in scorers:
+        def best_first():
+            for prefix in prefixes:
+                trie.top_k_scored(prefix, k, scorer)
+        
+        # what the search replaces: score every word with the prefix, then keep the k best
+        def enumerate_all():
+            for prefix in prefixes:
+                node, word = trie._prefix_root(prefix)
+                ranked = ((word, scorer.score(word, occurrence)) for word, occurrence in trie._iter_words(node, word))
+                heapq.nsmallest(k, ranked, key=lambda item: (-item[1], item[0]))
+        
+        instrumentation = trie.enable_instrumentation()
+        best_first()
+        visited = instrumentation.snapshot()["top_k_scored"]["totals"]["nodes_visited"]
+        trie.disable_instrumentation()
+        subtrees = sum(sum(1 for _ in trie._iter_nodes(*trie._prefix_root(prefix))) for prefix in prefixes)
+        
+        print(f"top {k}, {name + ':':11} {visited / len(prefixes):10,.1f} nodes visited best-first, "
+              f"{subtrees / len(prefixes):10,.1f} enumerated, per prefix")
+        print(f"top {k}, {name + ':':11} {1000 * timed(best_first) / len(prefixes):10.3f} ms best-first, "
+              f"{1000 * timed(enumerate_all) / len(prefixes):10.3f} ms enumerated, per prefix")
+
+
+def measure_corpus(n_tokens, n_queries = 2000):
+    """Measures the core operations on a synthetic corpus, for the regression suite.
+    
+    Parameters
+    ----------
+    n_tokens : int
+        Number of words in the corpus. Its vocabulary grows like the square root 
+        of it (Heaps' law), fitted to the Shakespeare word bank.
+    n_queries : int
+        Number of timed lookup() and autocomplete() calls.
+        
+    Returns
+    ----------
+    dict
+        The measurements, times in seconds and latencies in milliseconds.
+    """
+    words = synthetic_words(n_tokens, int(30 * n_tokens ** 0.5))
+    
+    build_seconds = timed(Trie, words, repeat = 1)
+    
+    # tracing slows every allocation down, so the build is timed without it
+    tracemalloc.start()
+    trie = Trie(words)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    
+    rng = random.Random(110)
+    queries = rng.sample(words, n_queries)
+    
+    def latencies(method, arguments):
+        result = []
+        for argument in arguments:
+            start = time.perf_counter()
+            method(argument)
+            result.append(time.perf_counter() - start)
+        p50, p99 = percentiles(result)
+        return {"p50_ms": p50, "p99_ms": p99}
+    
+    # one in two looked-up words is missing its last letter, i.e. mostly not a word
+    lookups = [word if i % 2 else word[:-1] for i, word in enumerate(queries)]
+    prefixes = [word[:rng.randint(1, 3)] for word in queries]
+    n_unique = len(trie.alphabetical_list())
+    
+    return {"tokens": n_tokens,
+            "unique_words": n_unique,
+            "build_seconds": build_seconds,
+            "build_tokens_per_sec": n_tokens / build_seconds,
+            "build_peak_bytes": peak_bytes,
+            "lookup": latencies(trie.lookup, lookups),
+            "autocomplete": latencies(trie.autocomplete, prefixes),
+            "alphabetical_list_words_per_sec": n_unique / timed(trie.alphabetical_list),
+            "k_most_common_per_sec": 1 / timed(trie.k_most_common, 10)}
+
+
+def run_suite(sizes, n_queries = 2000):
+    """Runs measure_corpus() on each corpus size and returns the JSON-serializable report."""
+    results = []
+    for n_tokens in sizes:
+        result = measure_corpus(n_tokens, n_queries)
+        print(f"{n_tokens:12,} tokens: build {result['build_seconds']:8.3f} sec "
+              f"{result['build_peak_bytes'] / 2 ** 20:8.1f} MiB peak, "
+              f"autocomplete p99 {result['autocomplete']['p99_ms']:8.3f} ms")
+        results.append(result)
+    
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results}
+
+
+def compare_reports(old, new):
+    """Prints the ratio new / old of every measurement of the corpus sizes both reports share."""
+    old_results = {result["tokens"]: result for result in old["results"]}
+    
+    def flatten(result, prefix = ""):
+        for name, value in result.items():
+            if isinstance(value, dict):
+                yield from flatten(value, prefix + name + ".")
+            else:
+                yield prefix + name, value
+    
+    for result in new["results"]:
+        if result["tokens"] not in old_results:
+            continue
+        old_values = dict(flatten(old_results[result["tokens"]]))
+        for name, value in flatten(result):
+            if name != "tokens" and old_values.get(name):
+                print(f"{result['tokens']:12,} tokens {name:34} {value / old_values[name]:6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmarks for the trie autocomplete engine.")
+    parser.add_argument("--suite", action = "store_true", help = "run the regression suite instead")
+    parser.add_argument("--sizes", type = lambda text: [int(float(size)) for size in text.split(",")],
+                        default = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7], help = "corpus sizes in tokens, e.g. 1e4,1e5")
+    parser.add_argument("--output", help = "file the JSON report of the suite is written to")
+    parser.add_argument("--compare", help = "JSON report of an earlier run of the suite")
+    parser.add_argument("--corpus", help = "UTF-8 text file, e.g. the works of Shakespeare, "
+                                          "used instead of the synthetic word list")
+    args = parser.parse_args()
+    
+    if args.suite:
+        report = run_suite(args.sizes)
+        if args.output:
+            with open(args.output, "w") as fileobj:
+                json.dump(report, fileobj, indent = 2)
+        else:
+            print(json.dumps(report, indent = 2))
+        if args.compare:
+            with open(args.compare) as fileobj:
+                compare_reports(json.load(fileobj), report)
+    else:
+        if args.corpus:
+            with open(args.corpus, encoding = "utf-8") as fileobj:
+                words = [word.lower() for word in tokenize(fileobj.read())]
+        else:
+            words = synthetic_words()
+        print(f"{len(words):,} words, {len(set(words)):,} unique")
+        bench_insert_lookup(words)
+        bench_build(words)
+        bench_startup(words)
+        bench_cold_start(words)
+        bench_batches(words)
+        bench_backends(words)
+        bench_fuzzy(words)
+        bench_parallel(words)
+        bench_service(words)
+        bench_result_cache(words)
+        bench_instrumentation(words)
+        bench_phrases(words)
+        bench_word_ids(words)
+        bench_infix(words)
+        bench_completions(words)
+        bench_scorers(words)
@@ -0,0 +1,390 @@
+"""Prefix-sharded autocomplete service.
+
+The vocabulary is split by the first character of each word across several
+worker processes, each holding the Trie of its shard and answering requests
+on a localhost port. An asyncio front end routes a query to the shard of its
+first character, or fans it out to all shards and merges the answers when the
+query spans them, i.e. k_most_common() and the empty prefix.
+
+Requests and responses are JSON objects, one per line:
+
+    {"id": 1, "op": "autocomplete", "args": ["th"]}
+    {"id": 1, "result": "the"}
+
+Usage, serving a text file with 4 shards on port 8765:
+
+    python service.py corpus.txt 4 8765
+"""
+
+import asyncio
+import heapq
+import json
+import sys
+import zlib
+from collections import Counter
+from collections.abc import Mapping
+from itertools import chain
+from multiprocessing import Pipe, Process
+
+from autocomplete import Trie, _best_completion, _rank_key, tokenize
+
+
+def shard_of(word, n_shards):
+    """Returns the shard holding a word, decided by its first character only.
+
+    Parameters
+    ----------
+    word : str
+        A lower-case word or prefix, must not be empty.
+    n_shards : int
+        Number of shards.
+    """
+    return zlib.crc32(word[0].encode("utf-8")) % n_shards
+
+
+def split_counts(words, n_shards):
+    """Splits a word list into one Counter per shard.
+
+    Parameters
+    ----------
+    words : list / Mapping
+        List of strings, or a Mapping such as a Counter from strings to their
+        occurrences. Words are converted into lower-case.
+    n_shards : int
+        Number of shards.
+
+    Returns
+    ----------
+    list of Counters
+        The occurrences of the words of each shard.
+    """
+    if not isinstance(words, Mapping):
+        words = Counter(words)
+
+    shards = [Counter() for _ in range(n_shards)]
+    for word, count in words.items():
+        word = word.lower()
+        if word:
+            shards[shard_of(word, n_shards)][word] += count
+
+    return shards
+
+
+class Client:
+    """This class sends requests over one connection to a shard or to the front end.
+
+    Many requests can be in flight at once, responses are matched to them by id.
+
+    Parameters
+    ----------
+    self._reader, self._writer --> asyncio streams
+        the connection
+    self._pending --> dict of int: Future
+        the requests waiting for their response, keyed by id
+    """
+
+    def __init__(self, reader, writer):
+        """Creates the Client instance on an open connection, see connect()."""
+        self._reader = reader
+        self._writer = writer
+        self._pending = {}
+        self._next_id = 0
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host, port):
+        """Opens a connection to a shard or to the front end and returns its Client."""
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, *args):
+        """Sends a request and waits for its result.
+
+        Parameters
+        ----------
+        op : str
+            Name of the method to call, e.g. "autocomplete".
+        args
+            Its arguments, which must be JSON serializable.
+
+        Returns
+        ----------
+        The result of the method, with lists of (word, occurrence) as tuples.
+        """
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+
+        self._writer.write(_encode({"id": self._next_id, "op": op, "args": args}))
+        return await future
+
+    async def close(self):
+        """Closes the connection, requests still in flight are cancelled."""
+        self._receiver.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    # inner method
+    async def _receive(self):
+        """Resolves the pending requests as their responses arrive."""
+        try:
+            while line := await self._reader.readline():
+                response = json.loads(line)
+                
+                # an answer to a line without an id, e.g. not JSON, belongs to no request
+                future = self._pending.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(_decode(response["result"]))
+        finally:
+            for future in self._pending.values():
+                future.cancel()
+
+
+class ShardedService:
+    """This class runs the shard workers and the front end routing requests to them.
+
+    Parameters
+    ----------
+    self.n_shards --> int
+        the number of shards, i.e. of worker processes
+    self.host --> str
+        the address everything listens on, localhost by default
+    self.ports --> list of int
+        the port of each shard worker
+
+    Methods
+    -------
+    connect(self)
+        Opens the connections to the shard workers, needed before any query.
+    serve(self, port)
+        Starts the front end, which answers requests from Clients.
+    autocomplete(self, prefix)
+        Same as Trie.autocomplete(), across the shards.
+    top_k_completions(self, prefix, k)
+        Same as Trie.top_k_completions(), across the shards.
+    k_most_common(self, k)
+        Same as Trie.k_most_common(), across the shards.
+    close(self)
+        Closes the connections and stops the shard workers.
+    """
+
+    def __init__(self, word_list, n_shards = 4, cache_k = None, host = "127.0.0.1"):
+        """Splits the words into shards and starts a worker process for each.
+
+        Parameters
+        ----------
+        word_list : list / Mapping
+            List of strings, or a Mapping such as a Counter from strings to
+            their occurrences, see split_counts().
+        n_shards : int
+            Number of shards, i.e. of worker processes.
+        cache_k : int
+            Passed on to the Trie of each shard.
+        host : str
+            The address the workers and the front end listen on.
+
+        Note: the workers are started before any event loop runs, since forking a
+        process with a running loop is not safe.
+        """
+        self.n_shards = n_shards
+        self.host = host
+        self.ports = []
+        self._processes = []
+        self._clients = []
+
+        for counts in split_counts(word_list, n_shards):
+            receiver, sender = Pipe(duplex = False)
+            process = Process(target = _run_shard, args = (counts, cache_k, host, sender), daemon = True)
+            process.start()
+            self._processes.append(process)
+            self.ports.append(receiver.recv()) # the worker reports its port once it listens
+
+    async def connect(self):
+        """Opens one connection to each shard worker."""
+        self._clients = [await Client.connect(self.host, port) for port in self.ports]
+
+    async def serve(self, port = 0):
+        """Starts the front end.
+
+        Parameters
+        ----------
+        port : int
+            The port to listen on, 0 (default) for any free port.
+
+        Returns
+        ----------
+        asyncio.Server
+            The running server, e.g. server.sockets[0].getsockname()[1] is its port.
+        """
+        handlers = {"autocomplete": self.autocomplete,
+                    "top_k_completions": self.top_k_completions,
+                    "k_most_common": self.k_most_common}
+
+        async def handle(op, args):
+            if op not in handlers:
+                return f"ERROR: unknown operation {op}"
+            return await handlers[op](*args)
+
+        return await asyncio.start_server(lambda reader, writer: _answer(reader, writer, handle), self.host, port)
+
+    async def autocomplete(self, prefix):
+        """Finds the most common word with the given prefix, see Trie.autocomplete()."""
+        prefix = prefix.lower()
+        if prefix:
+            return await self._shard(prefix).request("autocomplete", prefix)
+
+        # the empty prefix spans all shards, two words are enough to break a tie
+        return _best_completion(await self._fan_out(prefix, 2), prefix)
+
+    async def top_k_completions(self, prefix, k):
+        """Finds the k most common words with the given prefix, see Trie.top_k_completions()."""
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+
+        prefix = prefix.lower()
+        if prefix:
+            return await self._shard(prefix).request("top_k_completions", prefix, k)
+
+        return await self._fan_out(prefix, k)
+
+    async def k_most_common(self, k):
+        """Finds k words inserted most often, see Trie.k_most_common().
+
+        Note: unlike the Trie, no NOTE is printed when there are fewer than k words.
+        """
+        if k <= 0 or int(k) != k:
+            return "ERROR: k must be a positive integer"
+
+        common_words = await self._fan_out("", k)
+        if not common_words:
+            return "ERROR: no valid words to find the k most common words"
+
+        return common_words
+
+    async def close(self):
+        """Closes the connections to the shard workers and stops them."""
+        for client in self._clients:
+            await client.close()
+        self._clients = []
+
+        for process in self._processes:
+            process.terminate()
+            process.join()
+        self._processes = []
+
+    # inner method
+    def _shard(self, prefix):
+        """Returns the Client of the shard holding the words with the prefix."""
+        return self._clients[shard_of(prefix, self.n_shards)]
+
+    # inner method
+    async def _fan_out(self, prefix, k):
+        """Asks every shard for its top k completions of prefix and merges them."""
+        results = await asyncio.gather(*(client.request("top_k_completions", prefix, k) for client in self._clients))
+
+        # a shard without any word with the prefix answers with an error message
+        ranked = chain.from_iterable(result for result in results if isinstance(result, list))
+        return heapq.nsmallest(k, ranked, key=_rank_key)
+
+
+def _run_shard(counts, cache_k, host, sender):
+    """Worker process: builds the Trie of a shard and answers requests until terminated.
+
+    Parameters
+    ----------
+    counts : Counter
+        The occurrences of the words of the shard.
+    cache_k : int
+        Passed on to the Trie.
+    host : str
+        The address to listen on.
+    sender : Connection
+        The port is sent through it once the worker listens.
+    """
+    trie = Trie(counts, cache_k = cache_k)
+    handlers = {"autocomplete": trie.autocomplete,
+                "top_k_completions": trie.top_k_completions}
+
+    async def handle(op, args):
+        if op not in handlers:
+            return f"ERROR: unknown operation {op}"
+        return handlers[op](*args)
+
+    async def main():
+        server = await asyncio.start_server(lambda reader, writer: _answer(reader, writer, handle), host, 0)
+        sender.send(server.sockets[0].getsockname()[1])
+        sender.close()
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def _answer(reader, writer, handle):
+    """Answers the requests of one connection, concurrently and in any order.
+
+    Parameters
+    ----------
+    reader, writer : asyncio streams
+        The connection.
+    handle : coroutine function
+        Called with (op, args) for each request, returns the result. An exception,
+        including a line which is not a JSON request, is answered with an 
+        "ERROR: ..." result instead, whose id is null if the line has none.
+    """
+    async def respond(line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request["id"]
+            result = await handle(request["op"], request["args"])
+        except Exception as error:
+            # a malformed request still gets its answer, else its client would wait forever
+            result = f"ERROR: {type(error).__name__}: {error}"
+        writer.write(_encode({"id": request_id, "result": result}))
+
+    tasks = set()
+    try:
+        while line := await reader.readline():
+            task = asyncio.ensure_future(respond(line))
+
+            # keep a reference, the event loop only holds a weak one
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def _encode(message):
+    """Encodes a message as one line of JSON."""
+    return json.dumps(message, ensure_ascii = False).encode("utf-8") + b"\n"
+
+
+def _decode(result):
+    """Turns the lists of [word, occurrence] back into the tuples a Trie returns."""
+    if isinstance(result, list):
+        return [tuple(entry) for entry in result]
+    return result
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], encoding = "utf-8") as fileobj:
+        words = Counter(word.lower() for word in tokenize(fileobj.read()))
+    n_shards = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+
+    service = ShardedService(words, n_shards)
+
+    async def main():
+        await service.connect()
+        server = await service.serve(port)
+        print(f"NOTE: serving {len(words):,} words in {n_shards} shards on {service.host}:{port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    asyncio.run(main())
@@ -1,25 +1,66 @@
 from autocomplete import Node
 from autocomplete import Trie
-from requests import get
+from autocomplete import RadixTrie
+from autocomplete import ConcurrentTrie
+from autocomplete import PhraseTrie
+from autocomplete import LazyTrie, prebuilt
+from autocomplete import Scorer, WeightedScorer
+import autocomplete
+from service import Client, ShardedService
+import asyncio
+import json
+from collections import Counter
+from io import BytesIO, StringIO
+from math import log1p
+from os import makedirs, path
+import subprocess
+import sys
+from tempfile import TemporaryDirectory, gettempdir
+from threading import Thread
+from urllib.request import urlopen
+
+# the speeches and Shakespeare are downloaded once, later runs read this copy
+CORPUS_CACHE = path.join(gettempdir(), "trie-autocomplete-corpora")
+
+def get_text(url):
+    """Returns the text at url, from the local cache if it was downloaded before."""
+    cached = path.join(CORPUS_CACHE, url.rsplit("/", 1)[-1] + ".txt")
+    if not path.exists(cached):
+        with urlopen(url) as response:
+            # decoded like requests' .text, which the expected counts below come from
+            charset = response.headers.get_content_charset()
+            if charset is None:
+                charset = "ISO-8859-1" if response.headers.get_content_maintype() == "text" else "utf-8"
+            text = response.read().decode(charset)
+        makedirs(CORPUS_CACHE, exist_ok = True)
+        with open(cached, "w", encoding = "utf-8", newline = "") as fileobj:
+            fileobj.write(text)
+    
+    with open(cached, encoding = "utf-8", newline = "") as fileobj:
+        return fileobj.read()
+
+# the existing tests run against every backend of the same interface
+BACKENDS = [Trie, RadixTrie]
 
 
 ## 1. TEST lookup()
 
 # This is Namárië, JRRT's elvish poem written in Quenya
 wordbank = "Ai! laurië lantar lassi súrinen, yéni unótimë ve rámar aldaron! Yéni ve lintë yuldar avánier mi oromardi lisse-miruvóreva Andúnë pella, Vardo tellumar nu luini yassen tintilar i eleni ómaryo airetári-lírinen. Sí man i yulma nin enquantuva? An sí Tintallë Varda Oiolossëo ve fanyar máryat Elentári ortanë, ar ilyë tier undulávë lumbulë; ar sindanóriello caita mornië i falmalinnar imbë met, ar hísië untúpa Calaciryo míri oialë. Sí vanwa ná, Rómello vanwa, Valimar! Namárië! Nai hiruvalyë Valimar. Nai elyë hiruva. Namárië!".replace("!", "").replace("?", "").replace(".", "").replace(",", "").replace(";", "").split()
-trie = Trie(wordbank)
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
 
-# given tests
-assert trie.lookup('oiolossëo') == True # capital letters
-assert trie.lookup('an') == True # a prefix, but also a word
-assert trie.lookup('ele') == False # a prefix, but not a word
-assert trie.lookup('Mithrandir') == False # not in the wordbank
+    # given tests
+    assert trie.lookup('oiolossëo') == True # capital letters
+    assert trie.lookup('an') == True # a prefix, but also a word
+    assert trie.lookup('ele') == False # a prefix, but not a word
+    assert trie.lookup('Mithrandir') == False # not in the wordbank
 
-# extra tests
-assert trie.lookup('OROMARDI') == True # lower-case letters
-assert trie.lookup('lisse miruvóreva') == True # missing hyphen but still valid
-assert trie.lookup(' lantar ') == True # extra white space
-assert trie.lookup('lanta') == False # near-valid word with missing last letter
+    # extra tests
+    assert trie.lookup('OROMARDI') == True # lower-case letters
+    assert trie.lookup('lisse miruvóreva') == True # missing hyphen but still valid
+    assert trie.lookup(' lantar ') == True # extra white space
+    assert trie.lookup('lanta') == False # near-valid word with missing last letter
 
 print("Passed all tests!")
 
@@ -28,53 +69,56 @@ print("Passed all tests!")
 
 # given test
 wordbank = "Lorem ipsum dolor sit amet, consectetuer adipiscing elit. Duis pulvinar. Class aptent taciti sociosqu ad litora torquent per conubia nostra, per inceptos hymenaeos. Nunc dapibus tortor vel mi dapibus sollicitudin. Etiam quis quam. Curabitur ligula sapien, pulvinar a vestibulum quis, facilisis vel sapien.".replace(",", "").replace(".", "").split()
-trie = Trie(wordbank)
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
 
-assert trie.alphabetical_list() == ['a','ad','adipiscing','amet','aptent',
-                                    'class','consectetuer','conubia',
-                                    'curabitur','dapibus','dolor','duis',
-                                    'elit','etiam','facilisis','hymenaeos',
-                                    'inceptos','ipsum','ligula','litora',
-                                    'lorem','mi','nostra','nunc','per',
-                                    'pulvinar','quam','quis','sapien',
-                                    'sit','sociosqu','sollicitudin','taciti',
-                                    'torquent','tortor','vel','vestibulum']
+    assert trie.alphabetical_list() == ['a','ad','adipiscing','amet','aptent',
+                                        'class','consectetuer','conubia',
+                                        'curabitur','dapibus','dolor','duis',
+                                        'elit','etiam','facilisis','hymenaeos',
+                                        'inceptos','ipsum','ligula','litora',
+                                        'lorem','mi','nostra','nunc','per',
+                                        'pulvinar','quam','quis','sapien',
+                                        'sit','sociosqu','sollicitudin','taciti',
+                                        'torquent','tortor','vel','vestibulum']
 
 
 # extra test 1: previous wordbank
 wordbank = "Ai! laurië lantar lassi súrinen, yéni unótimë ve rámar aldaron! Yéni ve lintë yuldar avánier mi oromardi lisse-miruvóreva Andúnë pella, Vardo tellumar nu luini yassen tintilar i eleni ómaryo airetári-lírinen. Sí man i yulma nin enquantuva? An sí Tintallë Varda Oiolossëo ve fanyar máryat Elentári ortanë, ar ilyë tier undulávë lumbulë; ar sindanóriello caita mornië i falmalinnar imbë met, ar hísië untúpa Calaciryo míri oialë. Sí vanwa ná, Rómello vanwa, Valimar! Namárië! Nai hiruvalyë Valimar. Nai elyë hiruva. Namárië!".replace("!", "").replace("?", "").replace(".", "").replace(",", "").replace(";", "").split()
-trie = Trie(wordbank)
-
-assert trie.alphabetical_list() == ['ai', 'airetári-lírinen', 'aldaron', 'an', 'andúnë', 
-                             'ar', 'avánier','caita', 'calaciryo','eleni', 'elentári',
-                             'elyë','enquantuva','falmalinnar','fanyar','hiruva',
-                             'hiruvalyë', 'hísië', 'i', 'ilyë', 'imbë', 'lantar',
-                             'lassi', 'laurië', 'lintë','lisse-miruvóreva', 'luini',
-                             'lumbulë','man','met','mi','mornië','máryat','míri','nai',
-                             'namárië','nin','nu','ná','oialë','oiolossëo','oromardi',
-                             'ortanë','pella','rámar','rómello','sindanóriello','sí',
-                             'súrinen','tellumar','tier','tintallë','tintilar','undulávë',
-                             'untúpa','unótimë','valimar','vanwa','varda','vardo','ve',
-                             'yassen','yuldar','yulma','yéni','ómaryo']
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
+
+    assert trie.alphabetical_list() == ['ai', 'airetári-lírinen', 'aldaron', 'an', 'andúnë', 
+                                 'ar', 'avánier','caita', 'calaciryo','eleni', 'elentári',
+                                 'elyë','enquantuva','falmalinnar','fanyar','hiruva',
+                                 'hiruvalyë', 'hísië', 'i', 'ilyë', 'imbë', 'lantar',
+                                 'lassi', 'laurië', 'lintë','lisse-miruvóreva', 'luini',
+                                 'lumbulë','man','met','mi','mornië','máryat','míri','nai',
+                                 'namárië','nin','nu','ná','oialë','oiolossëo','oromardi',
+                                 'ortanë','pella','rámar','rómello','sindanóriello','sí',
+                                 'súrinen','tellumar','tier','tintallë','tintilar','undulávë',
+                                 'untúpa','unótimë','valimar','vanwa','varda','vardo','ve',
+                                 'yassen','yuldar','yulma','yéni','ómaryo']
 
 # extra test 2: all valid words but only one trie path
 wordbank = "a ab abc abcd abcde abcdef abcdefg".replace("!", "").replace("?", "").replace(".", "").replace(",", "").replace(";", "").split()
-trie = Trie(wordbank)
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
 
-assert trie.alphabetical_list() == ['a', 'ab', 'abc', 'abcd', 'abcde', 'abcdef', 'abcdefg']
+    assert trie.alphabetical_list() == ['a', 'ab', 'abc', 'abcd', 'abcde', 'abcdef', 'abcdefg']
 
 # extra test 3: empty word bank
 wordbank = "".replace("!", "").replace("?", "").replace(".", "").replace(",", "").replace(";", "").split()
-trie = Trie(wordbank)
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
 
-assert trie.alphabetical_list() == []
+    assert trie.alphabetical_list() == []
 
 print("Passed all tests!")
 
 
 ## 3. TEST k_most_common()
 
-# might have to pip install requests
 # Mehreen Faruqi - Black Lives Matter in Australia: https://bit.ly/CS110-Faruqi
 # John F. Kennedy - The decision to go to the Moon: https://bit.ly/CS110-Kennedy
 # Martin Luther King Jr. - I have a dream: https://bit.ly/CS110-King
@@ -87,78 +131,80 @@ bad_chars = [';', ',', '.', '?', '!', '_', '[', ']', ':', '“', '”', '"', '
 for speaker in speakers:
     
     # download and clean up the speech from extra characters
-    speech_full = get(f'https://bit.ly/CS110-{speaker}').text
+    speech_full = get_text(f'https://bit.ly/CS110-{speaker}')
     just_text = ''.join(c for c in speech_full if c not in bad_chars)
     without_newlines = ''.join(c if (c not in ['\n', '\r', '\t']) else " " for c in just_text)
     just_words = [word for word in without_newlines.split(" ") if word != ""]
     
-    trie = Trie(just_words)
+    for Backend in BACKENDS:
+        trie = Backend(just_words)
     
-    if speaker == 'Faruqi':
-        Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
-                  ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
-                  ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
-                  ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
-                  ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
+        if speaker == 'Faruqi':
+            Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
+                      ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
+                      ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
+                      ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
+                      ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
         
-        assert trie.k_most_common(20) == Faruqi
-    
-    elif speaker == 'Kennedy':
-        Kennedy = [('the', 117), ('and', 109), ('of', 93), ('to', 63), 
-                   ('this', 44), ('in', 43), ('we', 43), ('a', 39), 
-                   ('be', 30), ('for', 27), ('that', 27), ('as', 26), 
-                   ('it', 24), ('will', 24), ('new', 22), ('space', 22), 
-                   ('is', 21), ('all', 15), ('are', 15), ('have', 15), ('our', 15)]
-        assert trie.k_most_common(21) == Kennedy
-    
-    elif speaker == 'Havel':
-        Havel = [('the', 34), ('of', 23), ('and', 20), ('to', 15), 
-                 ('in', 13), ('a', 12), ('that', 12), ('are', 9), 
-                 ('we', 9), ('have', 8), ('human', 8), ('is', 8), 
-                 ('you', 8), ('as', 7), ('for', 7), ('has', 7), ('this', 7), 
-                 ('be', 6), ('it', 6), ('my', 6), ('our', 6), ('world', 6)]
-        assert trie.k_most_common(22) == Havel
-    
-    elif speaker == 'King':
-        King = [('the', 103), ('of', 99), ('to', 59), ('and', 54), ('a', 37), 
-                ('be', 33), ('we', 29), ('will', 27), ('that', 24), ('is', 23), 
-                ('in', 22), ('as', 20), ('freedom', 20), ('this', 20), 
-                ('from', 18), ('have', 17), ('our', 17), ('with', 16), 
-                ('i', 15), ('let', 13), ('negro', 13), ('not', 13), ('one', 13)]
-        assert trie.k_most_common(23) == King
-    
-    elif speaker == 'Thunberg':
-        Thunberg = [('you', 22), ('the', 20), ('and', 16), ('of', 15), 
-                    ('to', 14), ('are', 10), ('is', 9), ('that', 9), 
-                    ('be', 8), ('not', 7), ('with', 7), ('i', 6), 
-                    ('in', 6), ('us', 6), ('a', 5), ('how', 5), ('on', 5), 
-                    ('we', 5), ('all', 4), ('dare', 4), ('here', 4), 
-                    ('my', 4), ('people', 4), ('will', 4)]
-        assert trie.k_most_common(24) == Thunberg
+            assert trie.k_most_common(20) == Faruqi
+    
+        elif speaker == 'Kennedy':
+            Kennedy = [('the', 117), ('and', 109), ('of', 93), ('to', 63), 
+                       ('this', 44), ('in', 43), ('we', 43), ('a', 39), 
+                       ('be', 30), ('for', 27), ('that', 27), ('as', 26), 
+                       ('it', 24), ('will', 24), ('new', 22), ('space', 22), 
+                       ('is', 21), ('all', 15), ('are', 15), ('have', 15), ('our', 15)]
+            assert trie.k_most_common(21) == Kennedy
+    
+        elif speaker == 'Havel':
+            Havel = [('the', 34), ('of', 23), ('and', 20), ('to', 15), 
+                     ('in', 13), ('a', 12), ('that', 12), ('are', 9), 
+                     ('we', 9), ('have', 8), ('human', 8), ('is', 8), 
+                     ('you', 8), ('as', 7), ('for', 7), ('has', 7), ('this', 7), 
+                     ('be', 6), ('it', 6), ('my', 6), ('our', 6), ('world', 6)]
+            assert trie.k_most_common(22) == Havel
+    
+        elif speaker == 'King':
+            King = [('the', 103), ('of', 99), ('to', 59), ('and', 54), ('a', 37), 
+                    ('be', 33), ('we', 29), ('will', 27), ('that', 24), ('is', 23), 
+                    ('in', 22), ('as', 20), ('freedom', 20), ('this', 20), 
+                    ('from', 18), ('have', 17), ('our', 17), ('with', 16), 
+                    ('i', 15), ('let', 13), ('negro', 13), ('not', 13), ('one', 13)]
+            assert trie.k_most_common(23) == King
+    
+        elif speaker == 'Thunberg':
+            Thunberg = [('you', 22), ('the', 20), ('and', 16), ('of', 15), 
+                        ('to', 14), ('are', 10), ('is', 9), ('that', 9), 
+                        ('be', 8), ('not', 7), ('with', 7), ('i', 6), 
+                        ('in', 6), ('us', 6), ('a', 5), ('how', 5), ('on', 5), 
+                        ('we', 5), ('all', 4), ('dare', 4), ('here', 4), 
+                        ('my', 4), ('people', 4), ('will', 4)]
+            assert trie.k_most_common(24) == Thunberg
         
 print("Passed all tests!") 
 
 # extra test
 speaker = 'Faruqi'
-speech_full = get(f'https://bit.ly/CS110-{speaker}').text
+speech_full = get_text(f'https://bit.ly/CS110-{speaker}')
 just_text = ''.join(c for c in speech_full if c not in bad_chars)
 without_newlines = ''.join(c if (c not in ['\n', '\r', '\t']) else " " for c in just_text)
 just_words = [word for word in without_newlines.split(" ") if word != ""]
 
-trie = Trie(just_words)    
+for Backend in BACKENDS:
+    trie = Backend(just_words)    
     
-Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
-          ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
-          ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
-          ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
-          ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
+    Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
+              ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
+              ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
+              ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
+              ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
 
-print("extra test 1")
-print(trie.k_most_common(-1)) # negative number
-print("\n extra test 2")
-print(trie.k_most_common(0)) # zero
-print("\n extra test 3")
-print(trie.k_most_common(1000000)) # large number
+    print("extra test 1")
+    print(trie.k_most_common(-1)) # negative number
+    print("\n extra test 2")
+    print(trie.k_most_common(0)) # zero
+    print("\n extra test 3")
+    print(trie.k_most_common(1000000)) # large number
 
 
 ## 4. TEST autcomplete()
@@ -166,43 +212,784 @@ print(trie.k_most_common(1000000)) # large number
 bad_chars = [';', ',', '.', '?', '!', '1', '2', '3', '4',
              '5', '6', '7', '8', '9', '0', '_', '[', ']']
 
-SH_full = get('http://bit.ly/CS110-Shakespeare').text
+SH_full = get_text('http://bit.ly/CS110-Shakespeare')
 SH_just_text = ''.join(c for c in SH_full if c not in bad_chars)
 SH_without_newlines = ''.join(c if (c not in ['\n', '\r', '\t']) else " " for c in SH_just_text)
 SH_just_words = [word for word in SH_without_newlines.split(" ") if word != ""]
 
-SH_trie = Trie(SH_just_words)
+for Backend in BACKENDS:
+    SH_trie = Backend(SH_just_words)
 
-assert SH_trie.autocomplete('hist') == 'history'
-assert SH_trie.autocomplete('en') == 'enter'
-assert SH_trie.autocomplete('cae') == 'caesar'
-assert SH_trie.autocomplete('gen') == 'gentleman'
-assert SH_trie.autocomplete('pen') == 'pen'
-assert SH_trie.autocomplete('tho') == 'thou'
-assert SH_trie.autocomplete('pent') == 'pentapolis'
-assert SH_trie.autocomplete('petr') == 'petruchio'
+    assert SH_trie.autocomplete('hist') == 'history'
+    assert SH_trie.autocomplete('en') == 'enter'
+    assert SH_trie.autocomplete('cae') == 'caesar'
+    assert SH_trie.autocomplete('gen') == 'gentleman'
+    assert SH_trie.autocomplete('pen') == 'pen'
+    assert SH_trie.autocomplete('tho') == 'thou'
+    assert SH_trie.autocomplete('pent') == 'pentapolis'
+    assert SH_trie.autocomplete('petr') == 'petruchio'
 
 print("Passed all tests")
 
 # extra test
-speaker = 'Faruqi':
+speaker = 'Faruqi'
 bad_chars = [';', ',', '.', '?', '!', '_', '[', ']', ':', '“', '”', '"', '–', '-']
-speech_full = get(f'https://bit.ly/CS110-{speaker}').text
+speech_full = get_text(f'https://bit.ly/CS110-{speaker}')
 just_text = ''.join(c for c in speech_full if c not in bad_chars)
 without_newlines = ''.join(c if (c not in ['\n', '\r', '\t']) else " " for c in just_text)
 just_words = [word for word in without_newlines.split(" ") if word != ""]
 
-trie = Trie(just_words)
+for Backend in BACKENDS:
+    trie = Backend(just_words)
 
-Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
-          ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
-          ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
-          ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
-          ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
+    Faruqi = [('the', 60), ('and', 45), ('to', 39), ('in', 37), 
+              ('of', 34), ('is', 25), ('that', 22), ('this', 21), 
+              ('a', 20), ('people', 20), ('has', 14), ('are', 13), 
+              ('for', 13), ('we', 13), ('have', 12), ('racism', 12), 
+              ('black', 11), ('justice', 9), ('lives', 9), ('police', 9)]
 
-assert trie.autocomplete("") == "the" # empty prefix simple returns the most common word in trie
-assert trie.autocomplete("andd") == "ERROR: prefix does not exist in trie" # prefix is longer that the actual word
-assert trie.autocomplete("???") == "ERROR: prefix does not exist in trie" # bad characters that don't exist in trie
-assert trie.autocomplete("JU") == "justice" # capital letters
+    assert trie.autocomplete("") == "the" # empty prefix simple returns the most common word in trie
+    assert trie.autocomplete("andd") == "ERROR: prefix does not exist in trie" # prefix is longer that the actual word
+    assert trie.autocomplete("???") == "ERROR: prefix does not exist in trie" # bad characters that don't exist in trie
+    assert trie.autocomplete("JU") == "justice" # capital letters
 
 print("Passed all tests")
+
+
+## 5. TEST top_k_completions() and the cached mode
+
+wordbank = "the thee the then there the thou thou a an an and and and".split()
+trie = Trie(wordbank)
+cached_trie = Trie(wordbank, cache_k = 3)
+
+assert trie.top_k_completions('th', 3) == [('the', 3), ('thou', 2), ('thee', 1)]
+assert cached_trie.top_k_completions('th', 3) == [('the', 3), ('thou', 2), ('thee', 1)]
+assert cached_trie.top_k_completions('TH', 2) == [('the', 3), ('thou', 2)] # capital letters
+assert cached_trie.top_k_completions('', 5) == trie.top_k_completions('', 5) # k larger than the cache
+assert cached_trie.top_k_completions('then', 3) == [('then', 1)] # fewer words than k
+assert cached_trie.top_k_completions('x', 3) == "ERROR: prefix does not exist in trie"
+assert cached_trie.top_k_completions('th', 0) == "ERROR: k must be a positive integer"
+
+# the cached mode autocompletes exactly like the default mode, ties included
+for prefix in ['', 'a', 'an', 'and', 't', 'th', 'the', 'then', 'tho', 'x']:
+    assert cached_trie.autocomplete(prefix) == trie.autocomplete(prefix)
+
+print("Passed all tests!")
+
+
+## 6. TEST iter_words()
+
+wordbank = "Lorem ipsum dolor sit amet, consectetuer adipiscing elit. Duis pulvinar. Class aptent taciti sociosqu ad litora torquent per conubia nostra, per inceptos hymenaeos. Nunc dapibus tortor vel mi dapibus sollicitudin. Etiam quis quam. Curabitur ligula sapien, pulvinar a vestibulum quis, facilisis vel sapien.".replace(",", "").replace(".", "").split()
+trie = Trie(wordbank)
+
+assert list(trie.iter_words()) == trie.alphabetical_list()
+assert list(trie.iter_words('co')) == ['consectetuer', 'conubia']
+assert list(trie.iter_words('A')) == ['a', 'ad', 'adipiscing', 'amet', 'aptent'] # capital letters
+assert list(trie.iter_words('sapien')) == ['sapien'] # a word but not a prefix of others
+assert list(trie.iter_words('xyz')) == [] # prefix does not exist
+
+# extra test: a token much longer than the recursion limit
+long_token = "ab" * 5000
+trie = Trie([long_token, "a", long_token[:-1]])
+
+assert trie.alphabetical_list() == ["a", long_token[:-1], long_token]
+
+print("Passed all tests!")
+
+
+## 7. TEST bulk construction
+
+wordbank = "the thee The then there the thou Thou a an an and and and".split()
+trie = Trie(wordbank)
+
+# a Counter, a sorted list and insert() with a count all build the same trie
+counted_trie = Trie(Counter(wordbank))
+sorted_trie = Trie()
+sorted_trie.bulk_load(sorted(word.lower() for word in wordbank))
+counting_trie = Trie()
+for word, count in Counter(word.lower() for word in wordbank).items():
+    counting_trie.insert(word, count)
+
+for other in [counted_trie, sorted_trie, counting_trie]:
+    assert other.alphabetical_list() == trie.alphabetical_list()
+    assert other.k_most_common(8) == trie.k_most_common(8)
+
+assert trie.k_most_common(3) == [('and', 3), ('the', 3), ('an', 2)]
+assert Trie().alphabetical_list() == [] # no word list at all
+
+print("Passed all tests!")
+
+
+## 8. TEST from_stream()
+
+text = "Ai! laurië lantar lassi súrinen, yéni unótimë ve rámar aldaron! Yéni ve lintë yuldar avánier mi oromardi lisse-miruvóreva Andúnë pella, Vardo tellumar nu luini yassen tintilar i eleni ómaryo airetári-lírinen."
+trie = Trie(text.replace("!", "").replace(".", "").replace(",", "").split())
+
+# tiny chunks split words, and multi-byte characters in binary mode, across reads
+for chunk_size in [1, 3, 7, 1000]:
+    assert Trie.from_stream(StringIO(text), chunk_size = chunk_size).k_most_common(28) == trie.k_most_common(28)
+    assert Trie.from_stream(BytesIO(text.encode("utf-8")), chunk_size = chunk_size).k_most_common(28) == trie.k_most_common(28)
+
+# progress is reported after every chunk
+reports = []
+Trie.from_stream(StringIO(text), chunk_size = 40, progress = lambda tokens, seconds: reports.append(tokens))
+assert reports[-1] == 30
+assert reports == sorted(reports)
+
+print("Passed all tests!")
+
+
+## 9. TEST save() and load()
+
+wordbank = "Ai! laurië lantar lassi súrinen, yéni unótimë ve rámar aldaron! Yéni ve lintë yuldar avánier mi oromardi lisse-miruvóreva Andúnë pella, Vardo tellumar nu luini yassen tintilar i eleni ómaryo airetári-lírinen. Sí man i yulma nin enquantuva? An sí Tintallë Varda Oiolossëo ve fanyar máryat Elentári ortanë, ar ilyë tier undulávë lumbulë; ar sindanóriello caita mornië i falmalinnar imbë met, ar hísië untúpa Calaciryo míri oialë. Sí vanwa ná, Rómello vanwa, Valimar! Namárië! Nai hiruvalyë Valimar. Nai elyë hiruva. Namárië!".replace("!", "").replace("?", "").replace(".", "").replace(",", "").replace(";", "").split()
+trie = Trie(wordbank)
+
+with TemporaryDirectory() as directory:
+    file = path.join(directory, "namarie.trie")
+    trie.save(file)
+    
+    # the mapped trie answers every query like the trie it was saved from
+    for loaded in [Trie.load(file), Trie.load(file, mmap = False)]:
+        assert loaded.alphabetical_list() == trie.alphabetical_list()
+        assert loaded.k_most_common(10) == trie.k_most_common(10)
+        assert loaded.lookup('Oiolossëo') == True
+        assert loaded.lookup('lisse miruvóreva') == True
+        assert loaded.lookup('ele') == False
+        assert loaded.peek_occurrence('ve') == 3
+        assert loaded.peek_occurrence('mithrandir') == False
+        assert loaded.autocomplete('v') == trie.autocomplete('v')
+        assert loaded.autocomplete('ele') == trie.autocomplete('ele')
+        assert loaded.autocomplete('x') == "ERROR: prefix does not exist in trie"
+        assert loaded.top_k_completions('', 5) == trie.top_k_completions('', 5)
+    
+    # a mapped trie is read-only
+    loaded = Trie.load(file)
+    try:
+        loaded.insert('mithrandir')
+        assert False
+    except TypeError:
+        pass
+    
+    # and saved again as it is, also onto its own file
+    copied = path.join(directory, "copy.trie")
+    loaded.save(copied)
+    loaded.save(file)
+    with open(file, "rb") as original, open(copied, "rb") as copy:
+        assert original.read() == copy.read()
+    assert [word for word, _ in loaded._iter_nodes(loaded.root, "")] == [word for word, _ in trie._iter_nodes(trie.root, "")]
+    loaded.close()
+    
+    # an empty trie round-trips too
+    Trie().save(file)
+    assert Trie.load(file).alphabetical_list() == []
+
+print("Passed all tests!")
+
+
+## 10. TEST lookup_many() and autocomplete_many()
+
+wordbank = "the thee the then there the thou thou a an an and and and".split()
+trie = Trie(wordbank)
+
+words = ['thou', 'THE', 'th', 'xyz', ' an ', 'thee', 'thou']
+assert trie.lookup_many(words) == [trie.lookup(word) for word in words]
+
+prefixes = ['th', 'a', 'TH', 'x', '', 'then', 'tho', 'a']
+assert trie.autocomplete_many(prefixes) == [trie.autocomplete(prefix) for prefix in prefixes]
+assert trie.autocomplete_many(prefixes, k = 2) == [trie.top_k_completions(prefix, 2) for prefix in prefixes]
+assert trie.autocomplete_many([]) == []
+assert trie.autocomplete_many(prefixes, k = 0) == "ERROR: k must be a positive integer"
+
+print("Passed all tests!")
+
+
+## 11. TEST RadixTrie
+
+wordbank = "romane romanus romulus rubens ruber rubicon rubicundus rubens".split()
+trie = Trie(wordbank)
+radix_trie = RadixTrie(wordbank)
+
+# one node per edge instead of one per character
+assert radix_trie.memory_report()['nodes'] == 14
+assert radix_trie.memory_report()['nodes'] < trie.memory_report()['nodes']
+
+for prefix in ['', 'r', 'rom', 'roma', 'romanu', 'rube', 'rubic', 'rubicundus']:
+    assert radix_trie.autocomplete(prefix) == trie.autocomplete(prefix) # also halfway through an edge
+    assert list(radix_trie.iter_words(prefix)) == list(trie.iter_words(prefix))
+    assert radix_trie.top_k_completions(prefix, 3) == trie.top_k_completions(prefix, 3)
+
+assert radix_trie.lookup('rubic') == False # halfway through an edge
+assert radix_trie.lookup('rubicon') == True
+assert radix_trie.peek_occurrence('rubens') == 2
+assert radix_trie.autocomplete('rox') == "ERROR: prefix does not exist in trie"
+assert radix_trie.autocomplete('rubicundusx') == "ERROR: prefix does not exist in trie"
+
+print("Passed all tests!")
+
+
+## 12. TEST fuzzy_autocomplete()
+
+wordbank = "shakespeare shakespeare shakes shall shall shall and and andromeda hand".split()
+
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
+    
+    assert trie.fuzzy_autocomplete('shakespaer', 2, 1) == [('shakespeare', 2, 2)] # swapped letters
+    assert trie.fuzzy_autocomplete('andd', 1, 3) == [('and', 2, 1), ('andromeda', 1, 1)] # one letter too many
+    assert trie.fuzzy_autocomplete('and', 1, 4) == [('and', 2, 0), ('andromeda', 1, 0), ('hand', 1, 1)] # exact matches first
+    assert trie.fuzzy_autocomplete('SHAL', 0, 3) == [('shall', 3, 0)] # no edits is a plain prefix search
+    assert trie.fuzzy_autocomplete('xyz', 1, 3) == [] # nothing close enough
+    assert trie.fuzzy_autocomplete('and', -1, 3) == "ERROR: max_edits must be a non-negative integer"
+    assert trie.fuzzy_autocomplete('and', 1, 0) == "ERROR: k must be a positive integer"
+
+print("Passed all tests!")
+
+
+## 13. TEST build_parallel() and merge()
+
+chunks = ["The thee, the then.", "There the thou", "thou! A an an", "and and and"]
+wordbank = " ".join(chunks).replace(",", "").replace(".", "").replace("!", "").split()
+
+for Backend in BACKENDS:
+    expected = list(Backend(wordbank).iter_words())
+    
+    # under spawn and forkserver the pool workers import this script again, so only the 
+    # main process may start them
+    for workers in [1, 2] if __name__ == "__main__" else [1]:
+        trie = Backend.build_parallel(chunks, workers = workers)
+        assert list(trie.iter_words()) == expected
+        assert trie.peek_occurrence('the') == 3
+        assert trie.peek_occurrence('and') == 3
+
+    # merging sums the occurrences of shared words
+    trie = Backend(wordbank[:7])
+    trie.merge(Backend(wordbank[7:]))
+    assert [(word, trie.peek_occurrence(word)) for word in trie.iter_words()] == \
+           [(word, Backend(wordbank).peek_occurrence(word)) for word in expected]
+    trie.merge(Counter({'THE': 2, 'thy': 1}))
+    assert trie.peek_occurrence('the') == 5
+    assert trie.peek_occurrence('thy') == 1
+
+trie = Trie(wordbank[:7], cache_k = 2)
+trie.merge(Trie(wordbank[7:]))
+assert trie.top_k_completions('', 2) == Trie(wordbank).top_k_completions('', 2)
+
+print("Passed all tests!")
+
+
+## 14. TEST add(), remove() and decay()
+
+wordbank = "romane romanus romulus rubens ruber rubicon rubicundus rubens rubens ruber the the the".split()
+
+for Backend, cache_k in [(Trie, None), (Trie, 2), (RadixTrie, None)]:
+    trie = Backend(wordbank, cache_k = cache_k)
+    counts = Counter(wordbank)
+    
+    def check():
+        fresh = Backend(counts, cache_k = cache_k)
+        assert trie.memory_report()['nodes'] == fresh.memory_report()['nodes'] # dead branches are pruned
+        for prefix in ['', 'r', 'rom', 'rub', 'rube', 'rubicon', 't']:
+            assert list(trie.iter_words(prefix)) == list(fresh.iter_words(prefix))
+            assert trie.top_k_completions(prefix, 2) == fresh.top_k_completions(prefix, 2)
+            assert trie.autocomplete(prefix) == fresh.autocomplete(prefix)
+    
+    trie.add('rubicon', 4)
+    counts['rubicon'] += 4
+    check()
+    
+    trie.add('rubens', -2) # a decrease moves the word down the ranking
+    counts['rubens'] -= 2
+    check()
+    
+    assert trie.remove('rubicundus') == 1
+    del counts['rubicundus']
+    check()
+    
+    assert trie.remove('ruben') == False # only a prefix
+    assert trie.remove('rube') == False
+    assert trie.remove('rubens') == 1 # ruber is still there
+    del counts['rubens']
+    check()
+    
+    trie.add('ruber', -5) # dropping to zero removes the word
+    del counts['ruber']
+    check()
+    
+    assert trie.decay(0.5) == 3 # romane, romanus and romulus drop to zero
+    counts = Counter({'rubicon': 2, 'the': 1})
+    check()
+    
+    assert trie.decay(1.5) == "ERROR: factor must be between 0 and 1"
+    assert trie.decay(0) == 2
+    assert list(trie.iter_words()) == []
+    assert trie.memory_report()['nodes'] == 1
+
+print("Passed all tests!")
+
+
+## 15. TEST ConcurrentTrie
+
+wordbank = "the thee the then there the thou thou".split()
+trie = ConcurrentTrie(wordbank, cache_k = 3)
+first = trie.snapshot()
+
+trie.insert_many(["THOU", "thou", "thy"])
+assert trie.peek_occurrence('thou') == 4
+assert trie.autocomplete('th') == 'thou'
+assert first.peek_occurrence('thou') == 2 # published snapshots never change
+assert first.autocomplete('th') == 'the'
+assert trie.top_k_completions('th', 3) == Trie(wordbank + ["thou", "thou", "thy"]).top_k_completions('th', 3)
+
+second = trie.snapshot()
+assert trie.remove('thou') == 4
+trie.add('the', -2)
+trie.add('thy', 3)
+assert trie.decay(0.5) == 4 # the dropped to 1, so it goes like thee, then and there
+assert list(trie.iter_words()) == ['thy']
+assert trie.peek_occurrence('thy') == 2
+assert second.peek_occurrence('thou') == 4
+assert list(second.iter_words()) == ['the', 'thee', 'then', 'there', 'thou', 'thy']
+
+# stress test: readers must only ever see whole batches of the writer
+batch_size, n_batches = 10, 300
+errors = []
+done = False
+
+def write():
+    for i in range(n_batches):
+        trie.insert_many([f"w{i % 37}" for _ in range(batch_size - 1)] + ["th"])
+
+def read():
+    previous = 0
+    while not done:
+        snapshot = trie.snapshot()
+        total = sum(snapshot.peek_occurrence(word) for word in snapshot.iter_words("w"))
+        if total % (batch_size - 1) or total < previous:
+            errors.append(total)
+        previous = total
+        if trie.peek_occurrence('th') is not False and trie.autocomplete('w') == "ERROR: prefix does not exist in trie":
+            errors.append('w')
+
+readers = [Thread(target = read) for _ in range(8)]
+for reader in readers:
+    reader.start()
+write()
+done = True
+for reader in readers:
+    reader.join()
+
+assert errors == []
+assert sum(trie.peek_occurrence(word) for word in trie.iter_words("w")) == n_batches * (batch_size - 1)
+assert trie.peek_occurrence('th') == n_batches
+
+print("Passed all tests!")
+
+
+## 16. TEST ShardedService
+
+wordbank = "the thee the then there the thou thou a an an and and and romane romanus rubens ruber".split()
+# the shard workers are processes too, see the test of build_parallel()
+if __name__ == "__main__":
+    trie = Trie(wordbank)
+    service = ShardedService(wordbank, n_shards = 3)
+
+    async def query_service():
+        await service.connect()
+        server = await service.serve()
+        client = await Client.connect(service.host, server.sockets[0].getsockname()[1])
+        
+        try:
+            for prefix in ['', 't', 'TH', 'an', 'rub', 'x', 'thou']:
+                assert await client.request('autocomplete', prefix) == trie.autocomplete(prefix)
+                assert await client.request('top_k_completions', prefix, 3) == trie.top_k_completions(prefix, 3)
+            
+            # queries spanning the shards are merged
+            assert await client.request('k_most_common', 4) == trie.k_most_common(4)
+            assert await client.request('k_most_common', 0) == "ERROR: k must be a positive integer"
+            assert await client.request('lookup', 'the') == "ERROR: unknown operation lookup"
+            
+            # malformed requests are answered too, by the front end and by the shards
+            assert (await client.request('top_k_completions', 'th')).startswith("ERROR: TypeError")
+            assert (await client.request('autocomplete', 42)).startswith("ERROR: AttributeError")
+            assert (await service._shard('th').request('top_k_completions', 'th', 'x')).startswith("ERROR: TypeError")
+            assert await client.request('autocomplete', 'th') == trie.autocomplete('th') # the connection still works
+            
+            # a line which is not JSON is answered without an id, and the connection goes on
+            reader, writer = await asyncio.open_connection(service.host, server.sockets[0].getsockname()[1])
+            writer.write(b"not json\n" + b'["a list"]\n' + b'{"id": 7, "op": "autocomplete", "args": ["th"]}\n')
+            answers = [json.loads(await reader.readline()) for _ in range(3)]
+            assert sorted(answer["id"] is None for answer in answers) == [False, True, True]
+            assert {"id": 7, "result": trie.autocomplete('th')} in answers
+            writer.close()
+            
+            # many requests in flight on one connection
+            prefixes = ['t', 'a', 'r', 'th', 'ro'] * 20
+            results = await asyncio.gather(*(client.request('autocomplete', prefix) for prefix in prefixes))
+            assert results == [trie.autocomplete(prefix) for prefix in prefixes]
+        finally:
+            await client.close()
+            server.close()
+            await service.close()
+
+    asyncio.run(query_service())
+
+print("Passed all tests!")
+
+
+## 17. TEST enable_result_cache()
+
+wordbank = "the thee the then there the thou thou a an an and and and".split()
+
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
+    cache = trie.enable_result_cache(max_size = 3)
+    
+    assert trie.autocomplete('TH') == 'the'
+    assert trie.autocomplete('th') == 'the' # same normalized prefix
+    assert trie.top_k_completions('a', 2) == [('and', 3), ('an', 2)]
+    assert trie.k_most_common(1) == [('and', 3)]
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'evictions': 0, 'expirations': 0, 'invalidations': 0, 'size': 3}
+    
+    # only the prefixes of an inserted word are dropped
+    trie.insert('thou', 2)
+    assert cache.stats()['invalidations'] == 2 # 'th' and the k_most_common() of ''
+    assert trie.top_k_completions('a', 2) == [('and', 3), ('an', 2)]
+    assert cache.hits == 2
+    assert trie.autocomplete('th') == 'thou'
+    
+    trie.insert('ant')
+    assert trie.top_k_completions('a', 2) == [('and', 3), ('an', 2)]
+    assert cache.misses == 5
+    
+    # least recently used first out
+    trie.autocomplete('a')
+    trie.autocomplete('x')
+    assert cache.evictions == 1
+    assert trie.top_k_completions('a', 2) == [('and', 3), ('an', 2)]
+    assert cache.misses == 7
+    assert trie.autocomplete('th') == 'thou' # evicted
+    assert cache.misses == 8
+    
+    trie.remove('and')
+    assert trie.autocomplete('a') == 'an'
+    trie.decay(0.5)
+    assert len(cache) == 0
+    
+    # keywords work with the cache and without, and share the entries of positional calls
+    plain = Backend(wordbank)
+    assert plain.autocomplete(prefix = 'th') == 'the'
+    assert plain.top_k_completions('a', k = 2) == plain.top_k_completions(prefix = 'a', k = 2) == [('and', 3), ('an', 2)]
+    assert plain.k_most_common(k = 1) == [('and', 3)]
+    
+    hits = cache.hits
+    assert trie.autocomplete('TH') == trie.autocomplete(prefix = 'th')
+    assert trie.top_k_completions('th', 2) == trie.top_k_completions(prefix = 'TH', k = 2)
+    assert trie.k_most_common(2) == trie.k_most_common(k = 2)
+    assert cache.hits == hits + 3
+    
+    try:
+        trie.autocomplete(word = 'th')
+        assert False
+    except TypeError:
+        pass
+
+print("Passed all tests!")
+
+
+## 18. TEST enable_instrumentation()
+
+wordbank = "the thee the then there the thou thou a an an and and and".split()
+
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
+    instrumentation = trie.enable_instrumentation()
+    
+    assert trie.autocomplete('th') == 'the' # results are unchanged
+    assert trie.lookup('then') == True
+    assert trie.lookup('xyz') == False
+    trie.add('thou', 2) # calls insert(), which counts towards add()
+    
+    stats = instrumentation.snapshot()
+    assert sorted(stats) == ['add', 'autocomplete', 'lookup']
+    assert stats['lookup']['calls'] == 2
+    assert stats['lookup']['totals']['child_lookups'] == (5 if Backend is Trie else 4) # 'xyz' fails at the first look-up, a radix edge counts once
+    assert stats['lookup']['totals']['nodes_visited'] == (4 if Backend is Trie else 3)
+    assert stats['autocomplete']['totals']['words_materialized'] == 0 # ranked while searching, see _best_first()
+    assert sum(stats['autocomplete']['histograms']['microseconds'].values()) == 1
+    assert stats['add']['totals']['child_lookups'] == (4 if Backend is Trie else 2) # 'th' and 'ou' are single radix edges
+    
+    instrumentation.reset()
+    assert instrumentation.snapshot() == {}
+    
+    # a walk stops at the first missing child, and is counted so
+    assert trie.lookup('zzzzzzzzzz') == False
+    assert trie.lookup('thx') == False
+    stats = instrumentation.snapshot()
+    assert stats['lookup']['totals']['child_lookups'] == (1 + 3 if Backend is Trie else 1 + 2)
+    assert stats['lookup']['totals']['nodes_visited'] == (2 if Backend is Trie else 1)
+    instrumentation.reset()
+    
+    # disabled, the trie runs its plain methods again
+    trie.disable_instrumentation()
+    assert 'autocomplete' not in vars(trie) and '_walk' not in vars(trie)
+    assert trie.autocomplete('th') == 'thou'
+
+print("Passed all tests!")
+
+
+## 19. TEST PhraseTrie
+
+text = "To be, or not to be, that is the question. To be or not to be! To be honest, to be or not."
+phrases = PhraseTrie(text, n = 4)
+
+assert phrases.count('to be') == 6
+assert phrases.count('TO BE OR NOT') == 3
+assert phrases.count('or to') == False
+assert phrases.next_words('to be', 2) == [('or', 3), ('honest', 1)]
+assert phrases.next_words('whatever, or not to', 1) == [('be', 2)] # only the last n - 1 words matter
+assert PhraseTrie('a b c . x b d . x b d', n = 4).next_words('a b') == [('c', 1)] # a shorter phrase keeps all its words
+
+# the longest phrases, the last word may be partial
+assert phrases.complete('to be', 2) == [('to be or not', 3), ('to be honest to', 1)]
+assert phrases.complete('to b', 2) == phrases.complete('to be', 2)
+assert phrases.complete('to be ', 1) == [('to be or not', 3)]
+assert phrases.complete('is the q') == [('is the question to', 1)]
+assert phrases.complete('xyz') == "ERROR: phrase does not exist in trie"
+assert phrases.complete('to', 0) == "ERROR: k must be a positive integer"
+
+# count thresholds bound the memory
+removed = phrases.prune(3)
+assert phrases.count('to be or not') == 3
+assert phrases.count('to be honest') == False
+assert phrases.complete('to', 5) == [('to be or not', 3)]
+assert phrases.nodes == PhraseTrie(text, n = 4, min_count = 3).nodes == 10
+assert removed == 42
+
+bounded = PhraseTrie(text, n = 4, max_nodes = 20)
+assert bounded.nodes <= 20
+assert bounded.count('to be') == 6
+
+# the threshold of a prune doesn't stay, later phrases are kept from min_count on
+assert bounded.min_count == 1
+bounded.add_text("all the")
+assert bounded.count("all the") == 1
+bounded.add_text("all the world's a stage " * 3)
+assert bounded.nodes <= 20 and bounded.count("a stage") >= 1
+
+print("Passed all tests!")
+
+## 20. TEST word_id() and word_of()
+
+trie = Trie()
+for word in ["tinúviel", "lúthien", "beren", "lúthien", "elwë"]:
+    trie.insert(word)
+
+# ids follow the first insertion and survive removals and occurrence changes
+assert [trie.word_id(word) for word in ["tinúviel", "lúthien", "beren", "elwë"]] == [0, 1, 2, 3]
+assert trie.word_id("lúth") == False
+assert trie.remove("beren") == 1
+trie.add("lúthien", 5)
+trie.insert("beren")
+assert trie.word_id("lúthien") == 1
+assert trie.word_id("beren") == 4 # ids are never given again
+assert trie.word_of(2) == False
+assert trie.word_of(3) == "elwë"
+assert trie.word_of(99) == False
+assert sorted(trie._words) == [0, 1, 3, 4] # only the words in the trie keep their entry
+
+# a batch is inserted in alphabetical order, and so numbered
+assert [Trie(["lúthien", "beren"]).word_id(word) for word in ["beren", "lúthien"]] == [0, 1]
+
+# ids are kept by every backend and through the file, whose alphabet is interned
+with TemporaryDirectory() as directory:
+    trie.save(path.join(directory, "ids.trie"))
+    mapped = Trie.load(path.join(directory, "ids.trie"))
+    assert mapped._chars == sorted(set("tinúviellúthienberenelwë"))
+    assert mapped.word_id("elwë") == 3
+    assert [mapped.word_of(word_id) for word_id in range(6)] == ["tinúviel", "lúthien", False, "elwë", "beren", False]
+    assert len(mapped._word_node) == 4 # one entry per word, not per id ever given
+    mapped.close()
+    
+    loaded = Trie.load(path.join(directory, "ids.trie"), mmap = False)
+    assert loaded.word_id("beren") == 4
+    loaded.insert("idril")
+    assert loaded.word_id("idril") == 5
+
+radix = RadixTrie(["beren", "berúthiel", "beren"])
+radix.remove("beren")
+assert radix.word_id("berúthiel") == 1
+assert radix.word_id("ber") == False
+
+concurrent_trie = ConcurrentTrie(["beren", "lúthien", "lúthien"])
+published = concurrent_trie.snapshot()
+concurrent_trie.decay(0.5)
+assert concurrent_trie.word_id("lúthien") == 1
+assert concurrent_trie.word_of(0) == False
+assert published.word_of(0) == "beren" # published snapshots never change
+concurrent_trie.remove("lúthien")
+assert concurrent_trie._words == {} and published.word_of(1) == "lúthien"
+
+print("Passed all tests!")
+
+## 21. TEST infix_search() and enable_infix_index()
+
+words = ["shakespeare"] * 3 + ["speare"] + ["lisse-miruvóreva"] * 2 + ["miruvor", "spear", "pear"]
+trie = Trie(words)
+
+# without the index every word is scanned, with it the results are the same
+for indexed in [False, True]:
+    if indexed:
+        index = trie.enable_infix_index()
+        assert index.words[0] == "shakespeare"
+    assert trie.infix_search("SPEARE") == [("shakespeare", 3), ("speare", 1)]
+    assert trie.infix_search("ruvó", 1) == [("lisse-miruvóreva", 2)]
+    assert trie.infix_search("ear", 3) == [("shakespeare", 3), ("pear", 1), ("spear", 1)]
+    assert trie.infix_search("ruvor") == [("miruvor", 1)]
+    assert trie.infix_search("xyz") == "ERROR: fragment does not exist in trie"
+    assert trie.infix_search("ear", 0) == "ERROR: k must be a positive integer"
+    assert len(trie.infix_search("", 20)) == 6
+
+# the index follows insertions and removals without being rebuilt
+trie.insert("pearl", 5)
+assert trie.infix_index.changed == {"pearl"}
+assert trie.infix_search("ear", 2) == [("pearl", 5), ("shakespeare", 3)]
+trie.remove("shakespeare")
+trie.add("spear", 3)
+assert trie.infix_search("speare") == [("speare", 1)]
+assert trie.infix_search("ear") == [("pearl", 5), ("spear", 4), ("pear", 1), ("speare", 1)]
+assert trie.infix_index is index
+
+# decay() changes every occurrence, so the index is rebuilt
+trie.decay(0.5)
+assert trie.infix_index.stale
+assert trie.infix_search("ear") == [("pearl", 2), ("spear", 2)]
+assert trie.infix_index is not index and not trie.infix_index.changed
+
+print("Passed all tests!")
+
+## 22. TEST completions()
+
+trie = Trie({"the": 9, "then": 3, "there": 5, "these": 5, "this": 7, "tree": 1, "a": 2})
+
+# alphabetical pages, the token carries the prefix and the order
+page, token = trie.completions("th", page_size = 2)
+assert page == [("the", 9), ("then", 3)]
+page, token = trie.completions(page_size = 2, token = token)
+assert page == [("there", 5), ("these", 5)]
+page, token = trie.completions(page_size = 2, token = token)
+assert page == [("this", 7)] and token is None
+
+# by frequency, the token alone resumes once the traversal is dropped
+page, token = trie.completions("T", order = "freq", page_size = 3)
+assert page == [("the", 9), ("this", 7), ("there", 5)]
+trie._cursors.clear()
+page, token = trie.completions(page_size = 3, token = token)
+assert page == [("these", 5), ("then", 3), ("tree", 1)] and token is None
+
+# a change in between is seen by the next page
+page, token = trie.completions("", page_size = 4)
+assert page == [("a", 2), ("the", 9), ("then", 3), ("there", 5)]
+trie.remove("these")
+trie.insert("thy")
+page, token = trie.completions(page_size = 4, token = token)
+assert page == [("this", 7), ("thy", 1), ("tree", 1)] and token is None
+
+assert trie.completions("x") == "ERROR: prefix does not exist in trie"
+assert trie.completions("t", order = "random") == "ERROR: order must be 'alpha' or 'freq'"
+assert trie.completions("t", page_size = 0) == "ERROR: page_size must be a positive integer"
+
+# every backend pages the same way
+radix = RadixTrie({"the": 9, "then": 3, "there": 5, "these": 5, "this": 7})
+assert radix.completions("the", order = "freq", page_size = 10) == ([("the", 9), ("there", 5), ("these", 5), ("then", 3)], None)
+with TemporaryDirectory() as directory:
+    radix.save(path.join(directory, "pages.trie"))
+    mapped = Trie.load(path.join(directory, "pages.trie"))
+    page, token = mapped.completions("th", order = "freq", page_size = 2)
+    assert page == [("the", 9), ("this", 7)]
+    mapped._cursors.clear()
+    assert mapped.completions(page_size = 2, token = token) == ([("there", 5), ("these", 5)], ("freq", "th", "these", 5))
+    mapped.close()
+
+# the frequency order skips subtrees by their highest occurrence, which a merge of radix nodes lowers too
+radix = RadixTrie({"ab": 9, "abc": 1, "x": 2})
+radix.remove("ab")
+assert radix.root.best == 2
+assert radix.completions(order = "freq") == ([("x", 2), ("abc", 1)], None)
+
+print("Passed all tests!")
+
+## 23. TEST prebuilt() and the command line
+
+with TemporaryDirectory() as directory:
+    corpus = path.join(directory, "namarie.txt")
+    with open(corpus, "w", encoding = "utf-8") as fileobj:
+        fileobj.write("Ai! laurië lantar lassi súrinen,\nyéni unótimë ve rámar aldaron!\nYéni ve lintë yuldar avánier")
+    
+    # the command line builds the file offline, from local text files only
+    subprocess.run([sys.executable, autocomplete.__file__, corpus, "-o", path.join(directory, "tries", "namarie.trie")],
+                   check = True, capture_output = True)
+    
+    # a RadixTrie is saved straight to the same file
+    subprocess.run([sys.executable, autocomplete.__file__, corpus, "-o", path.join(directory, "radix.trie"), "--radix"],
+                   check = True, capture_output = True)
+    with open(path.join(directory, "tries", "namarie.trie"), "rb") as trie_file, open(path.join(directory, "radix.trie"), "rb") as radix_file:
+        assert trie_file.read() == radix_file.read()
+    
+    trie = prebuilt("namarie", path.join(directory, "tries"))
+    assert isinstance(trie, LazyTrie)
+    assert trie._trie is None # nothing is read before the first query
+    assert trie.autocomplete("yé") == "yéni"
+    assert trie._trie is not None
+    assert trie.top_k_completions("l", 2) == [("lantar", 1), ("lassi", 1)]
+    trie.close()
+    
+    editable = prebuilt("namarie", path.join(directory, "tries"), mmap = False)
+    editable.insert("namárië")
+    assert editable.lookup("namárië")
+    
+    try:
+        prebuilt("missing", directory)
+        assert False
+    except FileNotFoundError:
+        pass
+
+print("Passed all tests!")
+
+## 24. TEST top_k_scored()
+
+wordbank = "the thee the then there the thou thou thy thy thy thoroughly".split()
+
+for Backend in BACKENDS:
+    trie = Backend(wordbank)
+    
+    # the default scorer ranks like top_k_completions()
+    assert trie.top_k_scored("th", 3, Scorer()) == trie.top_k_completions("th", 3) == [("the", 3), ("thy", 3), ("thou", 2)]
+    assert trie.top_k_scored("TH", 50, Scorer()) == trie.top_k_completions("th", 50)
+    
+    # longer words lose, a boosted word wins however rare
+    scorer = WeightedScorer(frequency = 1.0, length = 0.5, boosts = {"thoroughly": 5.0})
+    assert [word for word, score in trie.top_k_scored("th", 3, scorer)] == ["thoroughly", "the", "thy"] # ties alphabetically
+    assert trie.top_k_scored("tho", 1, scorer) == [("thoroughly", log1p(1) - 0.5 * 10 + 5.0)]
+    
+    # the word used an hour ago beats the one used a day ago, which has decayed to half
+    scorer = WeightedScorer(frequency = 0.0, recency = 1.0, last_used = {"then": 1000, "thee": 1000 + 23 * 3600}, 
+                            half_life = 3600, now = 1000 + 24 * 3600)
+    assert trie.top_k_scored("th", 2, scorer)[0] == ("thee", 0.5)
+    
+    assert trie.top_k_scored("x", 1, scorer) == "ERROR: prefix does not exist in trie"
+    assert trie.top_k_scored("th", 0, scorer) == "ERROR: k must be a positive integer"
+    
+    # the search stops at the subtrees which cannot hold one of the k best words
+    instrumentation = trie.enable_instrumentation()
+    trie.top_k_scored("th", 1, Scorer())
+    visited = instrumentation.snapshot()["top_k_scored"]["totals"]["nodes_visited"]
+    trie.disable_instrumentation()
+    assert visited < len(list(trie._iter_nodes(*trie._prefix_root("th"))))
+
+try:
+    WeightedScorer(length = -1.0)
+    assert False
+except ValueError:
+    pass
+
+print("Passed all tests!")